@@ -1,6 +1,7 @@
 import asyncio
 import logging
 import os
+from functools import lru_cache
 from pathlib import Path
 
 from aiohttp import web
@@ -11,6 +12,7 @@ from dotenv import load_dotenv
 from document_sync import DocumentSync
 from ragtools import attach_rag_tools
 from rtmt import RTMiddleTier
+from settings import Settings
 
 logging.basicConfig(
     level=logging.INFO,
@@ -18,6 +20,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger("voicerag")
 
+# Instructions sent to the realtime model at session start
+_SYSTEM_MESSAGE = """
+        You are a helpful assistant. Only answer questions based on information you searched in the knowledge base, accessible with the 'search' tool. 
+        The user is listening to answers with audio, so it's *super* important that answers are as short as possible, a single sentence if at all possible. 
+        Never read file names or source names or keys out loud. 
+        Always use the following step-by-step instructions to respond: 
+        1. Always use the 'search' tool to check the knowledge base before answering a question. 
+        2. Always use the 'report_grounding' tool to report the source of information from the knowledge base. 
+        3. Produce an answer that's as short as possible. If the answer isn't in the knowledge base, say you don't know.
+    """.strip()
+
+@lru_cache(maxsize=1)
+def _settings() -> Settings:
+    """Environment-derived settings, resolved once per process."""
+    return Settings.from_env()
+
 async def create_app():
     logger.info("[App] Initializing application...")
     if not os.environ.get("RUNNING_IN_PRODUCTION"):
@@ -26,12 +44,13 @@ async def create_app():
     else:
         logger.info("[App] Running in production mode")
 
-    llm_key = os.environ.get("AZURE_OPENAI_API_KEY")
-    search_key = os.environ.get("AZURE_SEARCH_API_KEY")
+    settings = _settings()
+    llm_key = settings.openai_api_key
+    search_key = settings.search_api_key
 
     credential = None
     if not llm_key or not search_key:
-        if tenant_id := os.environ.get("AZURE_TENANT_ID"):
+        if tenant_id := settings.tenant_id:
             logger.info("Using AzureDeveloperCliCredential with tenant_id %s", tenant_id)
             credential = AzureDeveloperCliCredential(tenant_id=tenant_id, process_timeout=60)
         else:
@@ -42,40 +61,23 @@ async def create_app():
     
     app = web.Application()
 
-    # Get deployment name - gpt-realtime-mini for Realtime API (WebSocket)
-    realtime_deployment = os.environ.get("AZURE_OPENAI_REALTIME_DEPLOYMENT", "gpt-realtime-mini")
-    voice_choice = os.environ.get("AZURE_OPENAI_REALTIME_VOICE_CHOICE") or "alloy"
-
-    logger.info(f"[App] Initializing RTMiddleTier with endpoint: {os.environ['AZURE_OPENAI_ENDPOINT']}")
-    logger.info(f"[App] Realtime deployment: {realtime_deployment}, Voice: {voice_choice}")
+    logger.info(f"[App] Initializing RTMiddleTier with endpoint: {settings.openai_endpoint}")
+    logger.info(f"[App] Realtime deployment: {settings.realtime_deployment}, Voice: {settings.voice_choice}")
     rtmt = RTMiddleTier(
-        endpoint=os.environ["AZURE_OPENAI_ENDPOINT"],
-        deployment=realtime_deployment,
+        endpoint=settings.openai_endpoint,
+        deployment=settings.realtime_deployment,
         credentials=llm_credential,
-        voice_choice=voice_choice
+        voice_choice=settings.voice_choice
     )
     logger.info("[App] RTMiddleTier initialized successfully")
     
-    rtmt.system_message = """
-        You are a helpful assistant. Only answer questions based on information you searched in the knowledge base, accessible with the 'search' tool. 
-        The user is listening to answers with audio, so it's *super* important that answers are as short as possible, a single sentence if at all possible. 
-        Never read file names or source names or keys out loud. 
-        Always use the following step-by-step instructions to respond: 
-        1. Always use the 'search' tool to check the knowledge base before answering a question. 
-        2. Always use the 'report_grounding' tool to report the source of information from the knowledge base. 
-        3. Produce an answer that's as short as possible. If the answer isn't in the knowledge base, say you don't know.
-    """.strip()
+    rtmt.system_message = _SYSTEM_MESSAGE
 
     attach_rag_tools(rtmt,
         credentials=search_credential,
-        search_endpoint=os.environ.get("AZURE_SEARCH_ENDPOINT"),
-        search_index=os.environ.get("AZURE_SEARCH_INDEX"),
-        semantic_configuration=os.environ.get("AZURE_SEARCH_SEMANTIC_CONFIGURATION") or None,
-        identifier_field=os.environ.get("AZURE_SEARCH_IDENTIFIER_FIELD") or "chunk_id",
-        content_field=os.environ.get("AZURE_SEARCH_CONTENT_FIELD") or "chunk",
-        embedding_field=os.environ.get("AZURE_SEARCH_EMBEDDING_FIELD") or "text_vector",
-        title_field=os.environ.get("AZURE_SEARCH_TITLE_FIELD") or "title",
-        use_vector_query=(os.getenv("AZURE_SEARCH_USE_VECTOR_QUERY", "true") == "true")
+        search_endpoint=settings.search_endpoint,
+        search_index=settings.search_index,
+        **settings.rag_tool_kwargs()
         )
 
     logger.info("[App] Attaching WebSocket endpoint to app")
@@ -87,18 +89,18 @@ async def create_app():
     
     # Initialize document sync if storage endpoint is configured
     doc_sync: DocumentSync | None = None
-    if os.environ.get("AZURE_STORAGE_ENDPOINT") and os.environ.get("AZURE_SEARCH_INDEX"):
+    if settings.storage_endpoint and settings.search_index:
         try:
-            sync_interval = int(os.environ.get("DOCUMENT_SYNC_INTERVAL_SECONDS", "300"))  # Default: 5 minutes
             doc_sync = DocumentSync(
-                storage_endpoint=os.environ["AZURE_STORAGE_ENDPOINT"],
-                storage_container=os.environ.get("AZURE_STORAGE_CONTAINER", "documents"),
-                search_endpoint=os.environ.get("AZURE_SEARCH_ENDPOINT"),
-                indexer_name=os.environ.get("AZURE_SEARCH_INDEX"),
+                storage_endpoint=settings.storage_endpoint,
+                storage_container=settings.storage_container,
+                search_endpoint=settings.search_endpoint,
+                indexer_name=settings.search_index,
                 credential=search_credential,
-                sync_interval_seconds=sync_interval
+                sync_interval_seconds=settings.sync_interval_seconds,
+                max_concurrency=settings.sync_max_concurrency
             )
-            logger.info(f"[App] Document sync initialized (interval: {sync_interval}s)")
+            logger.info(f"[App] Document sync initialized (interval: {settings.sync_interval_seconds}s)")
         except Exception as e:
             logger.warning(f"[App] Failed to initialize document sync: {e}")
             doc_sync = None
@@ -106,21 +108,21 @@ async def create_app():
     # Store doc_sync in app for cleanup
     app["doc_sync"] = doc_sync
     
-    # Start document sync background task
-    async def on_startup(app):
-        sync = app.get("doc_sync")
+    # Run document sync in the background for the lifetime of the app
+    async def doc_sync_ctx(app):
+        sync = app["doc_sync"]
         if sync:
             sync.start()
             logger.info("[App] Document sync started")
+        try:
+            yield
+        finally:
+            if sync:
+                sync.stop()
+                await sync.close()
+                logger.info("[App] Document sync stopped")
     
-    async def on_cleanup(app):
-        sync = app.get("doc_sync")
-        if sync:
-            sync.stop()
-            logger.info("[App] Document sync stopped")
-    
-    app.on_startup.append(on_startup)
-    app.on_cleanup.append(on_cleanup)
+    app.cleanup_ctx.append(doc_sync_ctx)
     
     logger.info("[App] Application initialization complete")
     return app
@@ -1,17 +1,79 @@
 """Periodic document synchronization from local /data folder to Azure Blob Storage."""
 import asyncio
+import contextlib
 import logging
 import os
+import random
+import stat
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
+import aiofiles
+import aiohttp
+import xxhash
 from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import (
+    HttpResponseError,
+    ResourceNotFoundError,
+    ServiceRequestError,
+)
+from azure.core.pipeline.transport import AioHttpTransport
 from azure.identity import AzureDeveloperCliCredential, DefaultAzureCredential
-from azure.search.documents.indexes import SearchIndexerClient
-from azure.storage.blob import BlobServiceClient
+from azure.search.documents.indexes.aio import SearchIndexerClient
+from azure.storage.blob.aio import BlobServiceClient
+from watchfiles import Change, awatch
 
 logger = logging.getLogger("voicerag")
 
+# Status codes worth retrying within a sync cycle (throttling and transient service errors)
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Number of sync cycles served from the cached blob listing before it is re-listed from storage
+BLOB_CACHE_REFRESH_CYCLES = 12
+
+# Blobs below this size go up in a single PUT; larger ones are split into parallel block uploads
+SINGLE_PUT_THRESHOLD = 64 * 1024 * 1024
+BLOCK_SIZE = 8 * 1024 * 1024
+LARGE_BLOB_MAX_CONCURRENCY = 8
+
+# Files below this size are read straight into memory; larger ones are streamed in fixed-size chunks
+STREAM_THRESHOLD = 1024 * 1024
+STREAM_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Files at or above STREAM_THRESHOLD carry an xxh3 content hash in this blob metadata key, so an mtime
+# bump without a content change (touch, git checkout) doesn't re-upload them
+CONTENT_HASH_METADATA_KEY = "xxh3"
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+# After this many successful uploads in one batch the indexer is started without waiting for the rest
+INDEXER_EARLY_START_UPLOADS = 10
+
+# Connection pool shared by every storage request, sized for concurrent block uploads across files
+STORAGE_CONNECTION_LIMIT = 32
+STORAGE_CONNECTION_TIMEOUT_SECONDS = 30
+STORAGE_READ_TIMEOUT_SECONDS = 300
+STORAGE_DATA_BLOCK_SIZE = 4 * 1024 * 1024
+
+# With this many local files or fewer, per-blob property lookups are cheaper than listing the container
+PER_BLOB_LOOKUP_MAX_FILES = 50
+
+
+async def _read_chunks(file_path: Path, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Yield a file's contents in fixed-size chunks without blocking the event loop."""
+    async with aiofiles.open(file_path, "rb") as opened_file:
+        while chunk := await opened_file.read(chunk_size):
+            yield chunk
+
+
+async def _content_hash(file_path: Path) -> str:
+    """Hex xxh3-64 digest of a file, streamed in chunks to keep memory flat."""
+    hasher = xxhash.xxh3_64()
+    async for chunk in _read_chunks(file_path, HASH_CHUNK_SIZE):
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
 
 class DocumentSync:
     """Handles periodic synchronization of documents from local /data folder to blob storage."""
@@ -24,7 +86,9 @@ class DocumentSync:
         indexer_name: str,
         credential: AzureKeyCredential | AzureDeveloperCliCredential | DefaultAzureCredential,
         data_folder: str = "data",
-        sync_interval_seconds: int = 300  # Default: 5 minutes
+        sync_interval_seconds: int = 300,  # Default: 5 minutes
+        max_concurrency: int = 4,
+        indexer_debounce_seconds: float = 30
     ):
         """
         Initialize document sync.
@@ -37,6 +101,8 @@ class DocumentSync:
             credential: Azure credential for authentication
             data_folder: Local folder path containing documents (relative to project root)
             sync_interval_seconds: How often to check for new documents (in seconds)
+            max_concurrency: Maximum number of blob uploads in flight at once
+            indexer_debounce_seconds: Quiet period after the last upload before the indexer is run
         """
         self.storage_endpoint = storage_endpoint
         self.storage_container = storage_container
@@ -45,120 +111,381 @@ class DocumentSync:
         self.credential = credential
         self.data_folder = Path(data_folder)
         self.sync_interval_seconds = sync_interval_seconds
-        self._running = False
+        self.max_concurrency = max(1, max_concurrency)
+        self.indexer_debounce_seconds = indexer_debounce_seconds
+        self._stop_event = asyncio.Event()
         self._task: Optional[asyncio.Task] = None
+        # Trailing timer so bursts of uploads coalesce into a single indexer run
+        self._indexer_pending: Optional[asyncio.TimerHandle] = None
+        self._indexer_tasks: set[asyncio.Task] = set()
+        # Serializes indexer trigger calls; a trigger that finds the indexer still running is rescheduled
+        self._indexer_lock = asyncio.Lock()
+        # Blob name -> (last modified timestamp, content hash), so idle cycles don't re-list the whole container
+        self._blob_cache: Optional[dict[str, tuple[float, Optional[str]]]] = None
+        self._cycles_since_refresh = 0
+        # Local filename -> (mtime, size) as of the last fully successful cycle
+        self._last_snapshot: Optional[dict[str, tuple[float, int]]] = None
+        # Set once the container is known to exist, so each cycle doesn't re-check it
+        self._container_verified = False
         
         # Get project root (assuming this file is in app/backend/)
-        project_root = Path(__file__).parent.parent.parent
+        project_root = Path(__file__).resolve().parent.parent.parent
         self.data_path = project_root / self.data_folder
         
-        # Initialize clients
+        # Initialize clients; the transport owns one pooled aiohttp session so connections survive across cycles
+        transport = AioHttpTransport(
+            session=aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=STORAGE_CONNECTION_LIMIT)),
+            connection_timeout=STORAGE_CONNECTION_TIMEOUT_SECONDS,
+            read_timeout=STORAGE_READ_TIMEOUT_SECONDS,
+            connection_data_block_size=STORAGE_DATA_BLOCK_SIZE
+        )
         self.blob_client = BlobServiceClient(
             account_url=storage_endpoint,
             credential=credential,
-            max_single_put_size=4 * 1024 * 1024
+            transport=transport,
+            max_single_put_size=SINGLE_PUT_THRESHOLD,
+            max_block_size=BLOCK_SIZE
         )
+        self._container_client = self.blob_client.get_container_client(storage_container)
         self.indexer_client = SearchIndexerClient(search_endpoint, credential)
     
     async def sync_documents(self) -> None:
         """Sync documents from local /data folder to blob storage."""
         try:
             if not self.data_path.exists():
-                logger.debug(f"Data folder does not exist: {self.data_path} (this is normal in production)")
+                logger.debug("Data folder does not exist: %s (this is normal in production)", self.data_path)
                 return
             
             if not self.data_path.is_dir():
-                logger.warning(f"Data path exists but is not a directory: {self.data_path}")
+                logger.warning("Data path exists but is not a directory: %s", self.data_path)
                 return
             
-            container_client = self.blob_client.get_container_client(self.storage_container)
-            if not container_client.exists():
-                logger.info(f"Creating container: {self.storage_container}")
-                container_client.create_container()
+            # Snapshot local files as name -> (mtime, size); DirEntry caches the stat results from the
+            # directory read, so this is the only stat per file for the whole cycle
+            snapshot = {}
+            with os.scandir(self.data_path) as entries:
+                for entry in entries:
+                    if entry.is_file() and not entry.name.startswith('.'):
+                        st = entry.stat()
+                        snapshot[entry.name] = (st.st_mtime, st.st_size)
             
-            # Get list of existing blobs
-            existing_blobs = {blob.name: blob.last_modified for blob in container_client.list_blobs()}
+            refresh_due = self._blob_cache is None or self._cycles_since_refresh >= BLOB_CACHE_REFRESH_CYCLES
+            if snapshot == self._last_snapshot and not refresh_due:
+                self._cycles_since_refresh += 1
+                logger.debug("Local documents unchanged since last sync, skipping")
+                return
             
-            # Track if any new files were uploaded
-            new_files_uploaded = False
+            container_client = await self._get_container_client()
             
-            # Check each file in /data folder
-            for file_path in self.data_path.iterdir():
-                if file_path.is_file() and not file_path.name.startswith('.'):
-                    filename = file_path.name
-                    local_mtime = file_path.stat().st_mtime
-                    
-                    # Check if blob exists and if local file is newer
-                    should_upload = False
-                    if filename not in existing_blobs:
-                        logger.info(f"New file detected, uploading: {filename}")
-                        should_upload = True
-                    else:
-                        # Compare modification times (blob last_modified is timezone-aware datetime)
-                        blob_mtime = existing_blobs[filename].timestamp()
-                        if local_mtime > blob_mtime:
-                            logger.info(f"File updated locally, re-uploading: {filename}")
-                            should_upload = True
-                    
-                    if should_upload:
-                        try:
-                            with open(file_path, "rb") as opened_file:
-                                container_client.upload_blob(
-                                    filename,
-                                    opened_file,
-                                    overwrite=True
-                                )
-                            logger.info(f"Successfully uploaded: {filename}")
-                            new_files_uploaded = True
-                        except Exception as e:
-                            logger.error(f"Error uploading {filename}: {e}")
+            # Get list of existing blobs, re-listing the container only every few cycles
+            if refresh_due:
+                self._blob_cache = await self._list_existing_blobs(container_client, list(snapshot))
+                self._cycles_since_refresh = 0
+            else:
+                self._cycles_since_refresh += 1
+            existing_blobs = self._blob_cache
             
-            # Trigger indexer if new files were uploaded
-            if new_files_uploaded:
+            # Collect the files that need uploading
+            candidates = []
+            for filename, (local_mtime, file_size) in snapshot.items():
+                file_path = self.data_path / filename
+                # Check if blob exists and if local file is newer
+                if filename not in existing_blobs:
+                    logger.info("New file detected, uploading: %s", filename)
+                    candidates.append((file_path, file_size, None))
+                    continue
+                # Compare modification times (cached as POSIX timestamps)
+                blob_mtime, blob_hash = existing_blobs[filename]
+                if local_mtime <= blob_mtime:
+                    continue
+                content_hash = None
+                if blob_hash and file_size >= STREAM_THRESHOLD:
+                    content_hash = await _content_hash(file_path)
+                    if content_hash == blob_hash:
+                        logger.debug("File touched but content unchanged, skipping: %s", filename)
+                        existing_blobs[filename] = (local_mtime, blob_hash)
+                        continue
+                logger.info("File updated locally, re-uploading: %s", filename)
+                candidates.append((file_path, file_size, content_hash))
+            
+            results = await self._upload_and_index(container_client, candidates)
+            
+            # Only remember the snapshot once every upload succeeded, so failures are retried next cycle
+            if all(result is True for result in results):
+                self._last_snapshot = snapshot
+                
+        except Exception as e:
+            logger.error("Error during document sync: %s", e, exc_info=True)
+    
+    async def sync_changes(self, changes: set[tuple[Change, str]]) -> None:
+        """Upload only the files reported as added or modified by the file watcher."""
+        try:
+            candidates = {}
+            for change, path in changes:
+                file_path = Path(path)
+                if change == Change.deleted or file_path.parent != self.data_path or file_path.name.startswith('.'):
+                    continue
                 try:
-                    logger.info(f"Triggering indexer: {self.indexer_name}")
-                    self.indexer_client.run_indexer(self.indexer_name)
-                    logger.info("Indexer triggered successfully")
-                except Exception as e:
-                    logger.error(f"Error triggering indexer: {e}")
+                    st = file_path.stat()
+                except FileNotFoundError:
+                    continue
+                if stat.S_ISREG(st.st_mode) and file_path not in candidates:
+                    logger.info("Change detected, uploading: %s", file_path.name)
+                    candidates[file_path] = st.st_size
+            
+            if not candidates:
+                return
+            
+            container_client = await self._get_container_client()
+            await self._upload_and_index(container_client, [(path, size, None) for path, size in candidates.items()])
+        except Exception as e:
+            logger.error("Error during document sync: %s", e, exc_info=True)
+    
+    async def _get_container_client(self):
+        """Get the container client, creating the container if it doesn't exist yet."""
+        container_client = self._container_client
+        if not self._container_verified:
+            if not await container_client.exists():
+                logger.info("Creating container: %s", self.storage_container)
+                await container_client.create_container()
+            self._container_verified = True
+        return container_client
+    
+    async def _list_existing_blobs(self, container_client, names: list[str]) -> dict[str, tuple[float, Optional[str]]]:
+        """Get last modified timestamps and content hashes for the blobs backing the given local files."""
+        if len(names) <= PER_BLOB_LOOKUP_MAX_FILES:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            
+            async def _get_state(name: str) -> Optional[tuple[float, Optional[str]]]:
+                async with semaphore:
+                    try:
+                        properties = await container_client.get_blob_client(name).get_blob_properties()
+                    except ResourceNotFoundError:
+                        return None
+                    return properties.last_modified.timestamp(), (properties.metadata or {}).get(CONTENT_HASH_METADATA_KEY)
+            
+            states = await asyncio.gather(*(_get_state(name) for name in names))
+            return {name: state for name, state in zip(names, states) if state is not None}
+        
+        # Narrow the listing when every local file shares a common name prefix
+        prefix = os.path.commonprefix(names) or None
+        return {
+            blob.name: (blob.last_modified.timestamp(), (blob.metadata or {}).get(CONTENT_HASH_METADATA_KEY))
+            async for blob in container_client.list_blobs(name_starts_with=prefix, include=["metadata"])
+        }
+    
+    async def _upload_and_index(
+        self,
+        container_client,
+        candidates: list[tuple[Path, int, Optional[str]]]
+    ) -> list[bool]:
+        """Upload files concurrently and trigger the indexer if anything was uploaded."""
+        # Upload concurrently, bounded so a large /data folder doesn't open unbounded connections
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def _upload_one(file_path: Path, file_size: int, content_hash: Optional[str]) -> bool:
+            async with semaphore:
+                return await self._upload_file(container_client, file_path, file_size, content_hash)
+        
+        # Structured concurrency: cancelling the sync task also cancels every in-flight upload
+        async with asyncio.TaskGroup() as task_group:
+            tasks = [task_group.create_task(_upload_one(*candidate)) for candidate in candidates]
+            # Start indexing once the first batch has landed so it overlaps with the remaining uploads
+            uploaded_count = 0
+            for next_done in asyncio.as_completed(tasks):
+                if await next_done is True:
+                    uploaded_count += 1
+                    if uploaded_count == INDEXER_EARLY_START_UPLOADS and len(tasks) > INDEXER_EARLY_START_UPLOADS:
+                        logger.info("%d files uploaded, starting indexer while the rest upload", uploaded_count)
+                        self._start_indexer_task()
+        results = [task.result() for task in tasks]
+        
+        # Schedule a trailing indexer run to pick up everything uploaded
+        if any(result is True for result in results):
+            self._schedule_indexer()
+        else:
+            logger.debug("No new or updated files to sync")
+        return results
+    
+    def _schedule_indexer(self) -> None:
+        """(Re)start the debounce timer that triggers the indexer."""
+        if self._indexer_pending:
+            self._indexer_pending.cancel()
+        loop = asyncio.get_running_loop()
+        self._indexer_pending = loop.call_later(self.indexer_debounce_seconds, self._start_indexer_task)
+        logger.debug("Indexer run scheduled in %ss", self.indexer_debounce_seconds)
+    
+    def _start_indexer_task(self) -> None:
+        if self._indexer_pending:
+            self._indexer_pending.cancel()
+        self._indexer_pending = None
+        task = asyncio.create_task(self._fire_indexer())
+        self._indexer_tasks.add(task)
+        task.add_done_callback(self._indexer_tasks.discard)
+    
+    async def _fire_indexer(self) -> None:
+        """Trigger the search indexer so newly uploaded blobs get indexed."""
+        async with self._indexer_lock:
+            try:
+                logger.info("Triggering indexer: %s", self.indexer_name)
+                await self._with_retry(
+                    lambda: self.indexer_client.run_indexer(self.indexer_name),
+                    f"run indexer {self.indexer_name}"
+                )
+                logger.info("Indexer triggered successfully")
+            except Exception as e:
+                if getattr(e, "status_code", None) == 409:
+                    # The lock only orders the trigger calls; the service rejects a run while the previous one
+                    # (e.g. the early start) is still executing, so try again after the debounce period
+                    logger.info("Indexer %s is already running, rescheduling the run", self.indexer_name)
+                    if not self._stop_event.is_set():
+                        self._schedule_indexer()
+                    return
+                logger.error("Error triggering indexer: %s", e)
+    
+    async def _with_retry(self, coro_factory: Callable[[], Awaitable[Any]], op_name: str, attempts: int = 5) -> Any:
+        """Run an Azure call, retrying transient failures with exponential backoff and jitter."""
+        for attempt in range(attempts):
+            try:
+                return await coro_factory()
+            except (ServiceRequestError, HttpResponseError) as e:
+                status_code = getattr(e, "status_code", None)
+                retryable = isinstance(e, ServiceRequestError) or status_code in RETRYABLE_STATUS_CODES
+                if not retryable or attempt == attempts - 1:
+                    raise
+                delay = (2 ** attempt) + random.random()
+                logger.warning("Transient error during %s (status %s), retrying in %.1fs: %s", op_name, status_code, delay, e)
+                await asyncio.sleep(delay)
+    
+    async def _upload_file(
+        self,
+        container_client,
+        file_path: Path,
+        file_size: int,
+        content_hash: Optional[str] = None
+    ) -> bool:
+        """Upload a single file to the container, returning True on success."""
+        filename = file_path.name
+        try:
+            # Parallel block PUTs only pay off for large files
+            max_concurrency = 1 if file_size < SINGLE_PUT_THRESHOLD else LARGE_BLOB_MAX_CONCURRENCY
+            if file_size < STREAM_THRESHOLD:
+                async with aiofiles.open(file_path, "rb") as opened_file:
+                    data = await opened_file.read()
+                await self._with_retry(
+                    lambda: container_client.upload_blob(
+                        filename,
+                        data,
+                        overwrite=True,
+                        length=len(data)
+                    ),
+                    f"upload {filename}"
+                )
             else:
-                logger.debug("No new or updated files to sync")
-                
+                if content_hash is None:
+                    content_hash = await _content_hash(file_path)
+                # A fresh chunk stream per attempt keeps memory bounded by max_concurrency * chunk size
+                await self._with_retry(
+                    lambda: container_client.upload_blob(
+                        filename,
+                        _read_chunks(file_path),
+                        overwrite=True,
+                        length=file_size,
+                        max_concurrency=max_concurrency,
+                        metadata={CONTENT_HASH_METADATA_KEY: content_hash}
+                    ),
+                    f"upload {filename}"
+                )
+            if self._blob_cache is not None:
+                self._blob_cache[filename] = (time.time(), content_hash)
+            logger.info("Successfully uploaded: %s", filename)
+            return True
         except Exception as e:
-            logger.error(f"Error during document sync: {e}", exc_info=True)
+            if isinstance(e, ResourceNotFoundError):
+                # The container may have been deleted; check it again on the next cycle
+                self._container_verified = False
+            logger.error("Error uploading %s: %s", filename, e)
+            return False
     
     async def _sync_loop(self) -> None:
-        """Background task loop for periodic syncing."""
-        logger.info(f"Document sync started (checking every {self.sync_interval_seconds} seconds)")
-        while self._running:
-            try:
+        """Background task: full sync at startup, then sync files as the watcher reports changes.
+        
+        While the data folder is missing, or after the watcher fails, a full sync runs every sync_interval_seconds
+        instead, and watching resumes once the folder is there again.
+        """
+        await self.sync_once()
+        folder_missing_logged = False
+        while not self._stop_event.is_set():
+            if self.data_path.is_dir():
+                folder_missing_logged = False
+                try:
+                    await self._watch_changes()
+                except Exception as e:
+                    logger.error("Error watching %s, polling until the next attempt: %s", self.data_path, e, exc_info=True)
+            elif not folder_missing_logged:
+                logger.info("Data folder not found, checking for it every %s seconds: %s", self.sync_interval_seconds, self.data_path)
+                folder_missing_logged = True
+            
+            # Polling fallback; also keeps a watcher that keeps failing from restarting in a tight loop
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._stop_event.wait(), self.sync_interval_seconds)
+            if not self._stop_event.is_set():
                 await self.sync_documents()
+    
+    async def _watch_changes(self) -> None:
+        """Sync changes as the watcher reports them, until the stop event is set or the watcher ends."""
+        # Yielding on timeout keeps the periodic full sync as a safety net for missed events
+        logger.info("Document sync watching %s (full sync every %s seconds)", self.data_path, self.sync_interval_seconds)
+        async for changes in awatch(
+            self.data_path,
+            stop_event=self._stop_event,
+            rust_timeout=self.sync_interval_seconds * 1000,
+            yield_on_timeout=True,
+            recursive=False
+        ):
+            try:
+                if changes:
+                    await self.sync_changes(changes)
+                else:
+                    await self.sync_documents()
             except Exception as e:
-                logger.error(f"Error in sync loop: {e}", exc_info=True)
-            
-            # Wait for next sync interval
-            await asyncio.sleep(self.sync_interval_seconds)
+                logger.error("Error in sync loop: %s", e, exc_info=True)
     
     def start(self) -> None:
-        """Start the periodic sync task."""
-        if self._running:
+        """Start the background sync task."""
+        if self._task and not self._task.done():
             logger.warning("Document sync is already running")
             return
         
-        self._running = True
+        self._stop_event.clear()
         self._task = asyncio.create_task(self._sync_loop())
         logger.info("Document sync background task started")
     
     def stop(self) -> None:
-        """Stop the periodic sync task."""
-        if not self._running:
+        """Stop the background sync task."""
+        if not self._task:
             return
         
-        self._running = False
-        if self._task:
-            self._task.cancel()
+        self._stop_event.set()
+        self._task.cancel()
+        if self._indexer_pending:
+            self._indexer_pending.cancel()
+            self._indexer_pending = None
+        for task in self._indexer_tasks:
+            task.cancel()
         logger.info("Document sync background task stopped")
     
     async def sync_once(self) -> None:
         """Perform a one-time sync (useful for manual triggers or initial sync)."""
         await self.sync_documents()
+    
+    async def close(self) -> None:
+        """Wait for background work to finish cancelling, then close the storage and search clients."""
+        for task in (self._task, *self._indexer_tasks):
+            if task:
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+        self._task = None
+        self._indexer_tasks.clear()
+        await self.blob_client.close()
+        await self.indexer_client.close()
@@ -1,17 +1,97 @@
+import asyncio
 import base64
-import io
+import binascii
+import hashlib
 import logging
 import struct
+from collections import OrderedDict
+from collections.abc import AsyncIterator
 from typing import Optional
 
 import aiohttp
+import httpx
+import orjson
 from aiohttp import web
 from azure.core.credentials import AzureKeyCredential
 from azure.identity import DefaultAzureCredential, get_bearer_token_provider
 from openai import AsyncAzureOpenAI
 
+from rtmt import ToolResultDirection
+
 logger = logging.getLogger("voicerag")
 
+# Canonical 44-byte RIFF/WAVE header: RIFF chunk, 16-byte PCM fmt chunk, data chunk header
+_WAV_HEADER = struct.Struct('<4sI4s4sIHHIIHH4sI')
+_WAV_SIZE_FIELD = struct.Struct('<I')
+
+# Header for the 24 kHz / mono / 16-bit PCM the client always sends; only the two size fields vary
+_WAV_TEMPLATE_24K_MONO_16 = _WAV_HEADER.pack(b'RIFF', 36, b'WAVE', b'fmt ', 16, 1, 1, 24000, 48000, 2, 16, b'data', 0)
+
+# Bounded LRU caches so repeated audio or replies (UI retries, scripted runs) skip the Azure round trip
+_CACHE_MAX_ENTRIES = 512
+_STT_CACHE: OrderedDict[str, str] = OrderedDict()
+_TTS_CACHE: OrderedDict[str, bytes] = OrderedDict()
+
+# MP3 replies vary from a few KB to several MB, so the TTS cache is also bounded by total size and skips long replies
+_TTS_CACHE_MAX_BYTES = 64 * 1024 * 1024
+_TTS_CACHE_MAX_ENTRY_BYTES = 2 * 1024 * 1024
+_tts_cache_bytes = 0
+
+
+def _cache_key(*parts: bytes | str) -> str:
+    """Short blake2b digest of the given parts, used as an LRU cache key."""
+    hasher = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        hasher.update(part.encode() if isinstance(part, str) else part)
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+def _cache_get(cache: OrderedDict, key: str):
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+    return value
+
+
+def _cache_put(cache: OrderedDict, key: str, value) -> None:
+    cache[key] = value
+    cache.move_to_end(key)
+    if len(cache) > _CACHE_MAX_ENTRIES:
+        cache.popitem(last=False)
+
+
+def _tts_cache_put(key: str, audio: bytes) -> None:
+    """Cache a complete TTS reply, evicting the oldest replies until the cache fits its entry and byte budgets."""
+    global _tts_cache_bytes
+    if len(audio) > _TTS_CACHE_MAX_ENTRY_BYTES:
+        return
+    previous = _TTS_CACHE.pop(key, None)
+    if previous is not None:
+        _tts_cache_bytes -= len(previous)
+    _TTS_CACHE[key] = audio
+    _tts_cache_bytes += len(audio)
+    while len(_TTS_CACHE) > _CACHE_MAX_ENTRIES or _tts_cache_bytes > _TTS_CACHE_MAX_BYTES:
+        _, evicted = _TTS_CACHE.popitem(last=False)
+        _tts_cache_bytes -= len(evicted)
+
+
+def _detect_audio_container(data: bytes) -> Optional[tuple[str, str]]:
+    """Filename and content type for audio that already carries a container header, or None for raw PCM."""
+    if data[:4] == b'RIFF' and data[8:12] == b'WAVE':
+        return "audio.wav", "audio/wav"
+    if data[:4] == b'OggS':
+        return "audio.ogg", "audio/ogg"
+    # Only ID3-tagged MP3 is recognized; a bare frame sync (0xFFE) is too easily matched by PCM samples
+    if data[:3] == b'ID3':
+        return "audio.mp3", "audio/mpeg"
+    return None
+
+
+def _json_response(obj, status: int = 200) -> web.Response:
+    """JSON response serialized with orjson."""
+    return web.Response(body=orjson.dumps(obj), content_type="application/json", status=status)
+
 
 class MiniAPI:
     """Handles transcription using gpt-realtime-mini, chat completion, and TTS."""
@@ -32,12 +112,20 @@ class MiniAPI:
         # TTS requires tts-1 or tts-1-hd; gpt-realtime-mini does not support audio.speech.create
         self.tts_deployment = tts_deployment or realtime_deployment
         
+        # One keep-alive HTTP/2 pool shared by transcribe, chat and synthesize so requests skip TCP/TLS setup
+        http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=256, max_keepalive_connections=128, keepalive_expiry=60.0),
+            timeout=httpx.Timeout(60.0, connect=5.0),
+        )
+        
         # Initialize Azure OpenAI client
         if isinstance(credentials, AzureKeyCredential):
             self.client = AsyncAzureOpenAI(
                 api_key=credentials.key,
                 api_version="2024-02-15-preview",
                 azure_endpoint=endpoint,
+                http_client=http_client,
             )
         else:
             token_provider = get_bearer_token_provider(
@@ -47,83 +135,115 @@ class MiniAPI:
                 azure_ad_token_provider=token_provider,
                 api_version="2024-02-15-preview",
                 azure_endpoint=endpoint,
+                http_client=http_client,
             )
         
         self.conversation_history = []
+        # Oldest turns are dropped past this many messages so each request body stays bounded
+        self.max_history_messages = 40
         self.system_message = None
+        self._system_msg_dict = None
         self.tools = {}
+        # Tool schemas and names are rebuilt on registration rather than per chat turn
+        self._tools_schema_list = []
+        self._tool_names = []
         
     def set_system_message(self, message: str):
         """Set the system message for chat completions."""
         self.system_message = message
+        # Built once so each completion request reuses the same system entry
+        self._system_msg_dict = {"role": "system", "content": message} if message else None
         
     def add_tool(self, name: str, schema: dict, target):
         """Add a tool for function calling."""
         self.tools[name] = {"schema": schema, "target": target}
+        self._tools_schema_list = [tool["schema"] for tool in self.tools.values()]
+        self._tool_names = list(self.tools.keys())
+        
+    def _build_messages(self) -> list[dict]:
+        """System message (if set) followed by the conversation history."""
+        if self._system_msg_dict:
+            return [self._system_msg_dict, *self.conversation_history]
+        return list(self.conversation_history)
         
     def clear_conversation(self):
         """Clear conversation history."""
         self.conversation_history = []
         
+    def _trim_history(self):
+        """Drop the oldest messages beyond max_history_messages, keeping whole turns."""
+        history = self.conversation_history
+        excess = len(history) - self.max_history_messages
+        if excess <= 0:
+            return
+        # Advance to the next user message so no tool response is kept without its assistant tool call
+        while excess < len(history) and history[excess]["role"] != "user":
+            excess += 1
+        if excess == len(history):
+            # No user message after the cut (one long tool-heavy turn), so keep the latest user turn whole instead
+            excess = next((i for i in range(len(history) - 1, -1, -1) if history[i]["role"] == "user"), 0)
+        del history[:excess]
+        
     def _pcm_to_wav(self, pcm_data: bytes, sample_rate: int = 24000, channels: int = 1, sample_width: int = 2) -> bytes:
         """Convert PCM audio data to WAV format."""
-        # WAV header structure
-        wav_header = b'RIFF'
-        wav_header += struct.pack('<I', 0)  # File size (will be filled later)
-        wav_header += b'WAVE'
-        
-        # fmt chunk
-        wav_header += b'fmt '
-        wav_header += struct.pack('<I', 16)  # fmt chunk size
-        wav_header += struct.pack('<H', 1)   # audio format (1 = PCM)
-        wav_header += struct.pack('<H', channels)
-        wav_header += struct.pack('<I', sample_rate)
-        wav_header += struct.pack('<I', sample_rate * channels * sample_width)  # byte rate
-        wav_header += struct.pack('<H', channels * sample_width)  # block align
-        wav_header += struct.pack('<H', sample_width * 8)  # bits per sample
-        
-        # data chunk
-        wav_header += b'data'
-        wav_header += struct.pack('<I', len(pcm_data))
-        
-        # Combine header and data
-        wav_file = wav_header + pcm_data
-        
-        # Update file size in header
-        file_size = len(wav_file) - 8
-        wav_file = wav_file[:4] + struct.pack('<I', file_size) + wav_file[8:]
+        if (sample_rate, channels, sample_width) == (24000, 1, 2):
+            header = bytearray(_WAV_TEMPLATE_24K_MONO_16)
+            _WAV_SIZE_FIELD.pack_into(header, 4, 36 + len(pcm_data))
+            _WAV_SIZE_FIELD.pack_into(header, 40, len(pcm_data))
+            return bytes(header) + pcm_data
         
-        return wav_file
+        # Sizes are known upfront, so the whole header is packed in one pass
+        header = bytearray(_WAV_HEADER.size)
+        _WAV_HEADER.pack_into(
+            header, 0,
+            b'RIFF', 36 + len(pcm_data), b'WAVE',
+            b'fmt ', 16, 1, channels, sample_rate,  # fmt chunk size, audio format (1 = PCM)
+            sample_rate * channels * sample_width,  # byte rate
+            channels * sample_width,  # block align
+            sample_width * 8,  # bits per sample
+            b'data', len(pcm_data)
+        )
+        return bytes(header) + pcm_data
     
     async def transcribe_audio(self, audio_data: bytes) -> str:
         """Transcribe audio using gpt-realtime-mini API."""
         try:
-            logger.info(f"[MiniAPI] Starting transcription, audio size: {len(audio_data)} bytes")
-            logger.info(f"[MiniAPI] Using endpoint: {self.endpoint}, deployment: {self.realtime_deployment}")
+            logger.info("[MiniAPI] Starting transcription, audio size: %d bytes", len(audio_data))
+            logger.info("[MiniAPI] Using endpoint: %s, deployment: %s", self.endpoint, self.realtime_deployment)
             
-            # Convert PCM to WAV format
-            try:
-                wav_data = self._pcm_to_wav(audio_data)
-                logger.info(f"[MiniAPI] Converted to WAV, size: {len(wav_data)} bytes")
-            except Exception as wav_error:
-                logger.error(f"[MiniAPI] Error converting PCM to WAV: {wav_error}", exc_info=True)
-                raise web.HTTPInternalServerError(text=f"Audio conversion failed: {str(wav_error)}")
+            cache_key = _cache_key(self.realtime_deployment, audio_data)
+            if (cached_text := _cache_get(_STT_CACHE, cache_key)) is not None:
+                logger.info("[MiniAPI] Transcription cache hit: %s", cached_text)
+                return cached_text
             
-            # Create a file-like object from the WAV data
-            audio_file = io.BytesIO(wav_data)
-            audio_file.name = "audio.wav"
+            # Pass the bytes as a (filename, content, content type) tuple so httpx writes them straight into
+            # the multipart body without a BytesIO wrapper and read() copy
+            if container := _detect_audio_container(audio_data):
+                # Already an encoded file; wrapping it in another WAV header would corrupt it
+                filename, content_type = container
+                logger.info("[MiniAPI] Received %s audio, sending as-is", content_type)
+                audio_file = (filename, audio_data, content_type)
+            else:
+                # Convert PCM to WAV format
+                try:
+                    wav_data = self._pcm_to_wav(audio_data)
+                    logger.info("[MiniAPI] Converted to WAV, size: %d bytes", len(wav_data))
+                except Exception as wav_error:
+                    logger.error("[MiniAPI] Error converting PCM to WAV: %s", wav_error, exc_info=True)
+                    raise web.HTTPInternalServerError(text=f"Audio conversion failed: {str(wav_error)}")
+                audio_file = ("audio.wav", wav_data, "audio/wav")
             
             # Call transcription API
-            logger.info(f"[MiniAPI] Calling transcription API with model: {self.realtime_deployment}")
+            logger.info("[MiniAPI] Calling transcription API with model: %s", self.realtime_deployment)
             try:
                 transcription = await self.client.audio.transcriptions.create(
                     model=self.realtime_deployment,
                     file=audio_file,
                 )
-                logger.info(f"[MiniAPI] Transcription API call successful")
+                logger.info("[MiniAPI] Transcription API call successful")
             except Exception as api_error:
                 error_type = type(api_error).__name__
-                logger.error(f"[MiniAPI] Transcription API error ({error_type}): {api_error}", exc_info=True)
+                logger.error("[MiniAPI] Transcription API error (%s): %s", error_type, api_error, exc_info=True)
                 # Check for common errors
                 if "deployment" in str(api_error).lower() or "model" in str(api_error).lower():
                     raise web.HTTPInternalServerError(
@@ -138,22 +258,23 @@ class MiniAPI:
                     raise web.HTTPInternalServerError(text=f"Transcription API error: {str(api_error)}")
             
             if not hasattr(transcription, 'text') or not transcription.text:
-                logger.warn("[MiniAPI] Transcription returned empty text")
+                logger.warning("[MiniAPI] Transcription returned empty text")
                 return ""
             
-            logger.info(f"[MiniAPI] Transcription successful: {transcription.text}")
+            logger.info("[MiniAPI] Transcription successful: %s", transcription.text)
+            _cache_put(_STT_CACHE, cache_key, transcription.text)
             return transcription.text
         except web.HTTPException:
             # Re-raise HTTP exceptions
             raise
         except Exception as e:
-            logger.error(f"[MiniAPI] Unexpected error transcribing audio: {e}", exc_info=True)
+            logger.error("[MiniAPI] Unexpected error transcribing audio: %s", e, exc_info=True)
             raise web.HTTPInternalServerError(text=f"Transcription failed: {str(e)}")
     
     async def chat_completion(self, user_message: str) -> dict:
         """Get chat completion with RAG tools."""
         try:
-            logger.info(f"[MiniAPI] Starting chat completion, user message: {user_message}")
+            logger.info("[MiniAPI] Starting chat completion, user message: %s", user_message)
             # Add user message to conversation history
             self.conversation_history.append({
                 "role": "user",
@@ -161,183 +282,207 @@ class MiniAPI:
             })
             
             # Prepare messages
-            messages = []
-            if self.system_message:
-                messages.append({
-                    "role": "system",
-                    "content": self.system_message
-                })
-            messages.extend(self.conversation_history)
+            messages = self._build_messages()
             
             # Prepare tools if available
-            tools = None
-            if self.tools:
-                tools = [tool["schema"] for tool in self.tools.values()]
-                logger.info(f"[MiniAPI] Using {len(tools)} tools: {list(self.tools.keys())}")
+            tools = self._tools_schema_list or None
+            if tools:
+                logger.info("[MiniAPI] Using %d tools: %s", len(tools), self._tool_names)
             
             # Call chat completion API
-            logger.info(f"[MiniAPI] Calling chat completion API with model: {self.chat_deployment}")
+            logger.info("[MiniAPI] Calling chat completion API with model: %s", self.chat_deployment)
             response = await self.client.chat.completions.create(
                 model=self.chat_deployment,
                 messages=messages,
                 tools=tools,
                 tool_choice="auto" if tools else None,
             )
-            logger.info(f"[MiniAPI] Chat completion API response received")
+            logger.info("[MiniAPI] Chat completion API response received")
             
             # Handle function calls
             assistant_message = response.choices[0].message
             tool_results = []
             
             if assistant_message.tool_calls:
-                logger.info(f"[MiniAPI] Assistant requested {len(assistant_message.tool_calls)} tool calls")
-                # Add assistant message with tool calls
-                self.conversation_history.append({
-                    "role": "assistant",
-                    "content": assistant_message.content,
-                    "tool_calls": [
-                        {
-                            "id": tc.id,
-                            "type": tc.type,
-                            "function": {
-                                "name": tc.function.name,
-                                "arguments": tc.function.arguments,
-                            }
-                        }
-                        for tc in assistant_message.tool_calls
-                    ]
-                })
+                logger.info("[MiniAPI] Assistant requested %d tool calls", len(assistant_message.tool_calls))
+                # Add assistant message with tool calls; only the fields the API accepts back in history are kept
+                # (role, content, tool_calls[].id/type/function.name/function.arguments), not annotations, audio,
+                # refusal or fields added in later SDK versions
+                self.conversation_history.append(
+                    assistant_message.model_dump(mode="json", exclude_none=True, include={"role", "content", "tool_calls"})
+                )
+                
+                # Execute tool calls concurrently; they are independent network calls. Calls repeating the same
+                # tool and arguments within a turn share one search round trip.
+                tool_calls = [tc for tc in assistant_message.tool_calls if tc.function.name in self.tools]
+                unique_calls = {}
+                for tool_call in tool_calls:
+                    unique_calls.setdefault((tool_call.function.name, tool_call.function.arguments), tool_call)
+                for tool_call in unique_calls.values():
+                    logger.info("[MiniAPI] Executing tool: %s, arguments: %s", tool_call.function.name, tool_call.function.arguments)
+                unique_results = await asyncio.gather(
+                    *(self._run_tool(tool_call) for tool_call in unique_calls.values()),
+                    return_exceptions=True,
+                )
+                results_by_call = dict(zip(unique_calls, unique_results))
+                gathered = [results_by_call[(tc.function.name, tc.function.arguments)] for tc in tool_calls]
                 
-                # Execute tool calls
-                for tool_call in assistant_message.tool_calls:
+                # Record results in the original call order so the follow-up completion sees a deterministic history
+                for tool_call, tool_result in zip(tool_calls, gathered):
                     tool_name = tool_call.function.name
-                    logger.info(f"[MiniAPI] Executing tool: {tool_name}")
-                    if tool_name in self.tools:
-                        import json
-                        args = json.loads(tool_call.function.arguments)
-                        logger.info(f"[MiniAPI] Tool {tool_name} arguments: {args}")
-                        tool_result = await self.tools[tool_name]["target"](args)
-                        logger.info(f"[MiniAPI] Tool {tool_name} execution completed")
-                        
-                        # Add tool result to conversation
-                        tool_content = tool_result.to_text() if hasattr(tool_result, "to_text") else str(tool_result)
+                    if isinstance(tool_result, Exception):
+                        logger.error("[MiniAPI] Tool %s failed: %s", tool_name, tool_result)
                         self.conversation_history.append({
                             "role": "tool",
                             "tool_call_id": tool_call.id,
                             "name": tool_name,
-                            "content": tool_content,
+                            "content": f"Error: {tool_result}",
                         })
-                        
-                        # Store tool result - handle ToolResult objects
-                        tool_result_data = tool_result
-                        if hasattr(tool_result, "destination"):
-                            from rtmt import ToolResultDirection
-                            # If it's a ToolResult with TO_CLIENT direction, serialize it properly
-                            if tool_result.destination == ToolResultDirection.TO_CLIENT:
-                                # For TO_CLIENT, we need to return the actual data structure
-                                if hasattr(tool_result, "text") and isinstance(tool_result.text, dict):
-                                    tool_result_data = tool_result.text
-                                else:
-                                    try:
-                                        tool_result_data = json.loads(tool_result.to_text())
-                                    except:
-                                        tool_result_data = {"content": tool_result.to_text()}
+                        continue
+                    logger.info("[MiniAPI] Tool %s execution completed", tool_name)
+                    
+                    # Add tool result to conversation
+                    tool_content = tool_result.to_text() if hasattr(tool_result, "to_text") else str(tool_result)
+                    self.conversation_history.append({
+                        "role": "tool",
+                        "tool_call_id": tool_call.id,
+                        "name": tool_name,
+                        "content": tool_content,
+                    })
+                    
+                    # Store tool result - handle ToolResult objects
+                    tool_result_data = tool_result
+                    if hasattr(tool_result, "destination"):
+                        # If it's a ToolResult with TO_CLIENT direction, serialize it properly
+                        if tool_result.destination == ToolResultDirection.TO_CLIENT:
+                            # For TO_CLIENT, we need to return the actual data structure
+                            if hasattr(tool_result, "text") and isinstance(tool_result.text, dict):
+                                tool_result_data = tool_result.text
                             else:
-                                # For TO_SERVER, just use the text representation
-                                tool_result_data = {"content": tool_result.to_text()}
-                        
-                        tool_results.append({
-                            "name": tool_name,
-                            "result": tool_result_data,
-                        })
+                                try:
+                                    tool_result_data = orjson.loads(tool_result.to_text())
+                                except:
+                                    tool_result_data = {"content": tool_result.to_text()}
+                        else:
+                            # For TO_SERVER, just use the text representation
+                            tool_result_data = {"content": tool_result.to_text()}
+                    
+                    tool_results.append({
+                        "name": tool_name,
+                        "result": tool_result_data,
+                    })
                 
                 # Get final response after tool execution
                 logger.info("[MiniAPI] Getting final response after tool execution")
-                messages = []
-                if self.system_message:
-                    messages.append({
-                        "role": "system",
-                        "content": self.system_message
-                    })
-                messages.extend(self.conversation_history)
+                messages = self._build_messages()
                 
                 response = await self.client.chat.completions.create(
                     model=self.chat_deployment,
                     messages=messages,
                 )
                 assistant_message = response.choices[0].message
-                logger.info(f"[MiniAPI] Final response received: {assistant_message.content}")
+                logger.info("[MiniAPI] Final response received: %s", assistant_message.content)
             
             # Add assistant response to conversation history
             self.conversation_history.append({
                 "role": "assistant",
                 "content": assistant_message.content
             })
+            # Trim at the turn boundary, never between a tool call and its results
+            self._trim_history()
             
-            logger.info(f"[MiniAPI] Chat completion successful, returning response")
+            logger.info("[MiniAPI] Chat completion successful, returning response")
             return {
                 "text": assistant_message.content,
                 "tool_results": tool_results,
             }
             
         except Exception as e:
-            logger.error(f"[MiniAPI] Error in chat completion: {e}", exc_info=True)
+            logger.error("[MiniAPI] Error in chat completion: %s", e, exc_info=True)
             raise web.HTTPInternalServerError(text=f"Chat completion failed: {str(e)}")
     
-    async def synthesize_speech(self, text: str) -> bytes:
-        """Synthesize speech using Azure OpenAI TTS API (requires tts-1 or tts-1-hd deployment)."""
+    async def _run_tool(self, tool_call):
+        """Parse a tool call's arguments and invoke its registered target."""
+        args = orjson.loads(tool_call.function.arguments)
+        return await self.tools[tool_call.function.name]["target"](args)
+    
+    async def synthesize_speech(self, text: str) -> AsyncIterator[bytes]:
+        """Stream synthesized speech chunks from the Azure OpenAI TTS API (requires tts-1 or tts-1-hd deployment).
+        
+        TTS errors propagate to the caller so it can still report them before any audio has been sent.
+        """
         try:
-            logger.info(f"[MiniAPI] Starting speech synthesis, text: {text[:100]}...")
-            logger.info(f"[MiniAPI] Using TTS model: {self.tts_deployment}, voice: {self.voice_choice}")
-            response = await self.client.audio.speech.create(
+            logger.info("[MiniAPI] Starting speech synthesis, text: %s...", text[:100])
+            logger.info("[MiniAPI] Using TTS model: %s, voice: %s", self.tts_deployment, self.voice_choice)
+            cache_key = _cache_key(self.tts_deployment, self.voice_choice, text)
+            if (cached_audio := _cache_get(_TTS_CACHE, cache_key)) is not None:
+                logger.info("[MiniAPI] Speech synthesis cache hit, audio size: %d bytes", len(cached_audio))
+                yield cached_audio
+                return
+            
+            # Chunks are kept for the cache only while the reply is small enough to be cached
+            chunks = []
+            audio_size = 0
+            chunk_count = 0
+            async with self.client.audio.speech.with_streaming_response.create(
                 model=self.tts_deployment,
                 voice=self.voice_choice,
                 input=text,
-            )
-            
-            # Read the audio data - response is a streamable object
-            audio_data = b""
-            chunk_count = 0
-            async for chunk in response:
-                audio_data += chunk
-                chunk_count += 1
+            ) as response:
+                # Forward chunks as they arrive instead of buffering the whole reply
+                async for chunk in response.iter_bytes():
+                    audio_size += len(chunk)
+                    chunk_count += 1
+                    if chunks is not None:
+                        chunks.append(chunk)
+                        if audio_size > _TTS_CACHE_MAX_ENTRY_BYTES:
+                            chunks = None
+                    yield chunk
             
-            logger.info(f"[MiniAPI] Speech synthesis successful, audio size: {len(audio_data)} bytes, chunks: {chunk_count}")
-            return audio_data
+            # Only complete replies are cached
+            if chunks:
+                _tts_cache_put(cache_key, b"".join(chunks))
+            logger.info("[MiniAPI] Speech synthesis successful, audio size: %d bytes, chunks: %d", audio_size, chunk_count)
             
         except Exception as e:
-            logger.error(f"[MiniAPI] Error synthesizing speech: {e}", exc_info=True)
-            # If TTS fails, return empty audio
-            return b""
+            logger.error("[MiniAPI] Error synthesizing speech: %s", e, exc_info=True)
+            raise
     
     async def transcribe_handler(self, request: web.Request) -> web.Response:
-        """Handle POST /transcribe endpoint."""
+        """Handle POST /transcribe endpoint.
+        
+        The body is raw 24 kHz mono 16-bit PCM sent as application/octet-stream; a base64 text body is
+        accepted when the Content-Type says so (e.g. text/plain or application/base64).
+        """
         try:
             logger.info("[MiniAPI] /transcribe endpoint called")
             # Get audio data from request
             data = await request.read()
-            logger.info(f"[MiniAPI] Received {len(data)} bytes in request")
+            logger.info("[MiniAPI] Received %d bytes in request", len(data))
             
-            # Decode base64 if needed
-            try:
-                audio_data = base64.b64decode(data)
-                logger.info(f"[MiniAPI] Decoded base64, audio size: {len(audio_data)} bytes")
-            except Exception as decode_error:
-                logger.warn(f"[MiniAPI] Base64 decode failed: {decode_error}, using data as-is")
+            # Only decode when the client declares a base64 body, so raw PCM never goes through a decode attempt
+            content_type = request.headers.get("Content-Type", "")
+            if "base64" in content_type or content_type.startswith("text/"):
+                try:
+                    audio_data = base64.b64decode(data)
+                except binascii.Error as decode_error:
+                    logger.warning("[MiniAPI] Invalid base64 body: %s", decode_error)
+                    return _json_response({"error": "Invalid base64 audio data"}, status=400)
+                logger.info("[MiniAPI] Decoded base64, audio size: %d bytes", len(audio_data))
+            else:
                 audio_data = data
-                logger.info(f"[MiniAPI] Using raw data, size: {len(audio_data)} bytes")
             
             # Validate audio data
             if len(audio_data) == 0:
                 error_msg = "Empty audio data received"
-                logger.error(f"[MiniAPI] {error_msg}")
-                return web.json_response({"error": error_msg}, status=400)
+                logger.error("[MiniAPI] %s", error_msg)
+                return _json_response({"error": error_msg}, status=400)
             
             # Transcribe
             text = await self.transcribe_audio(audio_data)
             
-            logger.info(f"[MiniAPI] /transcribe endpoint returning: {text}")
-            return web.json_response({"text": text})
+            logger.info("[MiniAPI] /transcribe endpoint returning: %s", text)
+            return _json_response({"text": text})
             
         except web.HTTPException:
             # Re-raise HTTP exceptions (they already have proper status codes)
@@ -345,9 +490,9 @@ class MiniAPI:
         except Exception as e:
             error_msg = f"Transcription failed: {str(e)}"
             error_type = type(e).__name__
-            logger.error(f"[MiniAPI] Transcribe handler error ({error_type}): {error_msg}", exc_info=True)
+            logger.error("[MiniAPI] Transcribe handler error (%s): %s", error_type, error_msg, exc_info=True)
             # Return detailed error for debugging
-            return web.json_response({
+            return _json_response({
                 "error": error_msg,
                 "error_type": error_type,
                 "details": str(e)
@@ -357,54 +502,75 @@ class MiniAPI:
         """Handle POST /chat endpoint."""
         try:
             logger.info("[MiniAPI] /chat endpoint called")
-            data = await request.json()
+            data = orjson.loads(await request.read())
             user_message = data.get("message", "")
             
             if not user_message:
-                logger.warn("[MiniAPI] /chat endpoint called without message")
-                return web.json_response({"error": "Message is required"}, status=400)
+                logger.warning("[MiniAPI] /chat endpoint called without message")
+                return _json_response({"error": "Message is required"}, status=400)
             
             # Get chat completion
             result = await self.chat_completion(user_message)
             
-            logger.info(f"[MiniAPI] /chat endpoint returning response")
-            return web.json_response({
+            logger.info("[MiniAPI] /chat endpoint returning response")
+            return _json_response({
                 "text": result["text"],
                 "tool_results": result.get("tool_results", []),
             })
             
         except Exception as e:
-            logger.error(f"[MiniAPI] Chat handler error: {e}", exc_info=True)
-            return web.json_response({"error": str(e)}, status=500)
+            logger.error("[MiniAPI] Chat handler error: %s", e, exc_info=True)
+            return _json_response({"error": str(e)}, status=500)
     
-    async def synthesize_handler(self, request: web.Request) -> web.Response:
+    async def synthesize_handler(self, request: web.Request) -> web.StreamResponse:
         """Handle POST /synthesize endpoint."""
+        response = None
         try:
             logger.info("[MiniAPI] /synthesize endpoint called")
-            data = await request.json()
+            data = orjson.loads(await request.read())
             text = data.get("text", "")
             
             if not text:
-                logger.warn("[MiniAPI] /synthesize endpoint called without text")
-                return web.json_response({"error": "Text is required"}, status=400)
-            
-            # Synthesize speech
-            audio_data = await self.synthesize_speech(text)
-            
-            # Return as base64 encoded
-            audio_base64 = base64.b64encode(audio_data).decode("utf-8")
-            logger.info(f"[MiniAPI] /synthesize endpoint returning audio, size: {len(audio_base64)} chars")
+                logger.warning("[MiniAPI] /synthesize endpoint called without text")
+                return _json_response({"error": "Text is required"}, status=400)
             
-            return web.json_response({"audio": audio_base64})
+            # Stream the raw MP3 bytes to the client as Azure produces them. The first chunk is awaited before the
+            # headers are sent, so a TTS failure (auth, missing deployment, throttling) still gets an error status.
+            audio_stream = self.synthesize_speech(text)
+            try:
+                try:
+                    first_chunk = await audio_stream.__anext__()
+                except StopAsyncIteration:
+                    logger.error("[MiniAPI] Speech synthesis returned no audio")
+                    return _json_response({"error": "Speech synthesis returned no audio"}, status=502)
+                response = web.StreamResponse(headers={"Content-Type": "audio/mpeg", "X-Voice": self.voice_choice})
+                await response.prepare(request)
+                await response.write(first_chunk)
+                async for chunk in audio_stream:
+                    await response.write(chunk)
+            finally:
+                await audio_stream.aclose()
+            await response.write_eof()
+            logger.info("[MiniAPI] /synthesize endpoint finished streaming audio")
+            return response
             
         except Exception as e:
-            logger.error(f"[MiniAPI] Synthesize handler error: {e}", exc_info=True)
-            return web.json_response({"error": str(e)}, status=500)
+            logger.error("[MiniAPI] Synthesize handler error: %s", e, exc_info=True)
+            if response is not None and response.prepared:
+                # Headers are already on the wire; drop the connection so the client sees a truncated reply, not a
+                # complete one
+                response.force_close()
+                raise
+            return _json_response({"error": str(e)}, status=500)
     
     async def clear_handler(self, request: web.Request) -> web.Response:
         """Handle POST /clear endpoint to clear conversation history."""
         self.clear_conversation()
-        return web.json_response({"status": "cleared"})
+        return _json_response({"status": "cleared"})
+    
+    async def close(self):
+        """Close the underlying HTTP connection pool."""
+        await self.client.close()
     
     def attach_to_app(self, app: web.Application):
         """Attach REST endpoints to the app."""
@@ -412,4 +578,5 @@ class MiniAPI:
         app.router.add_post("/chat", self.chat_handler)
         app.router.add_post("/synthesize", self.synthesize_handler)
         app.router.add_post("/clear", self.clear_handler)
+        app.on_cleanup.append(lambda _app: self.close())
 
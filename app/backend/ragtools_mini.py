@@ -1,5 +1,5 @@
 """RAG tools adapter for MiniAPI."""
-import re
+import string
 from typing import Any
 
 from azure.core.credentials import AzureKeyCredential
@@ -75,15 +75,17 @@ async def _search_tool(
         vector_queries=vector_queries,
         select=", ".join([identifier_field, content_field])
     )
-    result = ""
-    async for r in search_results:
-        result += f"[{r[identifier_field]}]: {r[content_field]}\n-----\n"
+    result = "".join([f"[{r[identifier_field]}]: {r[content_field]}\n-----\n" async for r in search_results])
     return ToolResult(result, ToolResultDirection.TO_SERVER)
 
-KEY_PATTERN = re.compile(r'^[a-zA-Z0-9_=\-]+$')
+# Characters allowed in a grounding source key; translate() strips them all, so a valid key leaves nothing behind
+_STRIP_KEY_CHARS = str.maketrans('', '', string.ascii_letters + string.digits + "_=-")
+
+def _is_valid_key(s: str) -> bool:
+    return bool(s) and not s.translate(_STRIP_KEY_CHARS)
 
 async def _report_grounding_tool(search_client: SearchClient, identifier_field: str, title_field: str, content_field: str, args: Any) -> ToolResult:
-    sources = [s for s in args["sources"] if KEY_PATTERN.match(s)]
+    sources = [s for s in args["sources"] if _is_valid_key(s)]
     list = " OR ".join(sources)
     print(f"Grounding source: {list}")
     # Use search instead of filter to align with how detailt integrated vectorization indexes
@@ -62,7 +62,6 @@ class RTMiddleTier:
     disable_audio: Optional[bool] = None
     voice_choice: Optional[str] = None
     api_version: str = "2024-10-01-preview"
-    _tools_pending = {}
     _token_provider = None
 
     def __init__(self, endpoint: str, deployment: str, credentials: AzureKeyCredential | DefaultAzureCredential, voice_choice: Optional[str] = None):
@@ -77,7 +76,13 @@ class RTMiddleTier:
             self._token_provider = get_bearer_token_provider(credentials, "https://cognitiveservices.azure.com/.default")
             self._token_provider() # Warm up during startup so we have a token cached when the first request arrives
 
-    async def _process_message_to_client(self, msg: str, client_ws: web.WebSocketResponse, server_ws: web.WebSocketResponse) -> Optional[str]:
+    @staticmethod
+    def _tool_item_notice(item: dict) -> str:
+        # Tool items stay hidden, but clients get their ids so they can delete them (conversation.item.delete)
+        # along with the rest of a turn instead of carrying earlier turns' search results into later answers
+        return json.dumps({"type": "extension.middle_tier_tool_item", "item_id": item["id"]})
+
+    async def _process_message_to_client(self, msg: str, client_ws: web.WebSocketResponse, server_ws: web.WebSocketResponse, tools_pending: dict[str, RTToolCall]) -> Optional[str]:
         message = json.loads(msg.data)
         updated_message = msg.data
         if message is not None:
@@ -100,11 +105,11 @@ class RTMiddleTier:
                 case "conversation.item.created":
                     if "item" in message and message["item"]["type"] == "function_call":
                         item = message["item"]
-                        if item["call_id"] not in self._tools_pending:
-                            self._tools_pending[item["call_id"]] = RTToolCall(item["call_id"], message["previous_item_id"])
-                        updated_message = None
+                        if item["call_id"] not in tools_pending:
+                            tools_pending[item["call_id"]] = RTToolCall(item["call_id"], message["previous_item_id"])
+                        updated_message = self._tool_item_notice(item)
                     elif "item" in message and message["item"]["type"] == "function_call_output":
-                        updated_message = None
+                        updated_message = self._tool_item_notice(message["item"])
 
                 case "response.function_call_arguments.delta":
                     updated_message = None
@@ -115,7 +120,7 @@ class RTMiddleTier:
                 case "response.output_item.done":
                     if "item" in message and message["item"]["type"] == "function_call":
                         item = message["item"]
-                        tool_call = self._tools_pending[message["item"]["call_id"]]
+                        tool_call = tools_pending[message["item"]["call_id"]]
                         tool = self.tools[item["name"]]
                         args = item["arguments"]
                         result = await tool.target(json.loads(args))
@@ -139,8 +144,8 @@ class RTMiddleTier:
                         updated_message = None
 
                 case "response.done":
-                    if len(self._tools_pending) > 0:
-                        self._tools_pending.clear() # Any chance tool calls could be interleaved across different outstanding responses?
+                    if len(tools_pending) > 0:
+                        tools_pending.clear() # Any chance tool calls could be interleaved across different outstanding responses?
                         await server_ws.send_json({
                             "type": "response.create"
                         })
@@ -189,6 +194,9 @@ class RTMiddleTier:
             else:
                 headers = { "Authorization": f"Bearer {self._token_provider()}" } # NOTE: no async version of token provider, maybe refresh token on a timer?
             async with session.ws_connect("/openai/realtime", headers=headers, params=params) as target_ws:
+                # Tool calls in flight on this connection only; concurrent sessions must not see each other's calls
+                tools_pending: dict[str, RTToolCall] = {}
+
                 async def from_client_to_server():
                     async for msg in ws:
                         if msg.type == aiohttp.WSMsgType.TEXT:
@@ -206,7 +214,7 @@ class RTMiddleTier:
                 async def from_server_to_client():
                     async for msg in target_ws:
                         if msg.type == aiohttp.WSMsgType.TEXT:
-                            new_msg = await self._process_message_to_client(msg, ws, target_ws)
+                            new_msg = await self._process_message_to_client(msg, ws, target_ws, tools_pending)
                             if new_msg is not None:
                                 await ws.send_str(new_msg)
                         else:
@@ -0,0 +1,83 @@
+"""Application settings read once from the environment."""
+import logging
+import os
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any, Optional
+
+logger = logging.getLogger("voicerag")
+
+# Settings fields passed straight through to the RAG tool attach functions
+RAG_FIELD_NAMES = (
+    "semantic_configuration",
+    "identifier_field",
+    "content_field",
+    "embedding_field",
+    "title_field",
+    "use_vector_query",
+)
+
+
+def _env_int(env: Mapping[str, str], name: str, default: int) -> int:
+    """Integer setting for optional features, falling back to the default when the value is malformed."""
+    value = env.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning("[Settings] Invalid %s=%r, using default %s", name, value, default)
+        return default
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """All environment-derived configuration for the backend, validated before any client is built."""
+
+    openai_endpoint: str
+    realtime_deployment: str
+    voice_choice: str
+    search_endpoint: Optional[str]
+    search_index: Optional[str]
+    semantic_configuration: Optional[str]
+    identifier_field: str
+    content_field: str
+    embedding_field: str
+    title_field: str
+    use_vector_query: bool
+    openai_api_key: Optional[str] = None
+    search_api_key: Optional[str] = None
+    tenant_id: Optional[str] = None
+    storage_endpoint: Optional[str] = None
+    storage_container: str = "documents"
+    sync_interval_seconds: int = 300
+    sync_max_concurrency: int = 4
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """Build settings from os.environ, reading each variable exactly once."""
+        env = os.environ
+        return cls(
+            openai_endpoint=env["AZURE_OPENAI_ENDPOINT"],
+            realtime_deployment=env.get("AZURE_OPENAI_REALTIME_DEPLOYMENT", "gpt-realtime-mini"),
+            voice_choice=env.get("AZURE_OPENAI_REALTIME_VOICE_CHOICE") or "alloy",
+            search_endpoint=env.get("AZURE_SEARCH_ENDPOINT"),
+            search_index=env.get("AZURE_SEARCH_INDEX"),
+            semantic_configuration=env.get("AZURE_SEARCH_SEMANTIC_CONFIGURATION") or None,
+            identifier_field=env.get("AZURE_SEARCH_IDENTIFIER_FIELD") or "chunk_id",
+            content_field=env.get("AZURE_SEARCH_CONTENT_FIELD") or "chunk",
+            embedding_field=env.get("AZURE_SEARCH_EMBEDDING_FIELD") or "text_vector",
+            title_field=env.get("AZURE_SEARCH_TITLE_FIELD") or "title",
+            use_vector_query=env.get("AZURE_SEARCH_USE_VECTOR_QUERY", "true") == "true",
+            openai_api_key=env.get("AZURE_OPENAI_API_KEY"),
+            search_api_key=env.get("AZURE_SEARCH_API_KEY"),
+            tenant_id=env.get("AZURE_TENANT_ID"),
+            storage_endpoint=env.get("AZURE_STORAGE_ENDPOINT"),
+            storage_container=env.get("AZURE_STORAGE_CONTAINER", "documents"),
+            sync_interval_seconds=_env_int(env, "DOCUMENT_SYNC_INTERVAL_SECONDS", 300),
+            sync_max_concurrency=_env_int(env, "DOCUMENT_SYNC_MAX_CONCURRENCY", 4),
+        )
+
+    def rag_tool_kwargs(self) -> dict[str, Any]:
+        """Search field configuration as keyword arguments for attach_rag_tools."""
+        return {name: getattr(self, name) for name in RAG_FIELD_NAMES}
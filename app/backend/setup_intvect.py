@@ -1,9 +1,14 @@
 import json
 import logging
+import mmap
 import os
 import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 
+import requests
 from azure.core.exceptions import ResourceExistsError
+from azure.core.pipeline.transport import RequestsTransport
 from azure.identity import AzureDeveloperCliCredential
 from azure.search.documents.indexes import SearchIndexClient, SearchIndexerClient
 from azure.search.documents.indexes.models import (
@@ -16,6 +21,8 @@ from azure.search.documents.indexes.models import (
     IndexProjectionMode,
     InputFieldMappingEntry,
     OutputFieldMappingEntry,
+    ScalarQuantizationCompressionConfiguration,
+    ScalarQuantizationParameters,
     SearchableField,
     SearchField,
     SearchFieldDataType,
@@ -36,66 +43,102 @@ from azure.search.documents.indexes.models import (
     SplitSkill,
     VectorSearch,
     VectorSearchAlgorithmMetric,
+    VectorSearchCompressionTargetDataType,
     VectorSearchProfile,
     IndexingSchedule,
 )
 from azure.storage.blob import BlobServiceClient
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 from rich.logging import RichHandler
 
+# Number of files uploaded to blob storage at once by upload_documents
+UPLOAD_MAX_WORKERS = 8
+
+# Connection pool for the shared HTTP session: one pool per host, sized for parallel file and block uploads
+HTTP_POOL_CONNECTIONS = 4
+HTTP_POOL_MAXSIZE = 32
+
+# Files up to the single-put size go up in one request; larger files are split into blocks uploaded in parallel.
+# UPLOAD_MAX_WORKERS * BLOCK_MAX_CONCURRENCY must stay within HTTP_POOL_MAXSIZE so every block PUT gets a pooled connection.
+SINGLE_PUT_THRESHOLD = 8 * 1024 * 1024
+BLOCK_SIZE = 8 * 1024 * 1024
+BLOCK_MAX_CONCURRENCY = 4
+
+# Number of stale indexers deleted at once when the index is recreated
+DELETE_MAX_WORKERS = 8
+
+
+def find_default_azd_env_file():
+    """Locate the default azd env file from .azure/config.json without spawning azd"""
+    try:
+        with open(os.path.join(".azure", "config.json")) as config_file:
+            env_name = json.load(config_file).get("defaultEnvironment")
+    except (OSError, ValueError):
+        return None
+    if not env_name:
+        return None
+    env_file_path = os.path.join(".azure", env_name, ".env")
+    return env_file_path if os.path.isfile(env_file_path) else None
+
+
+def create_http_session():
+    """requests session shared by every client so HTTPS connections are pooled and kept alive between calls"""
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE))
+    return session
+
 
 def load_azd_env():
     """Get path to current azd env file and load file using python-dotenv"""
-    result = subprocess.run("azd env list -o json", shell=True, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise Exception("Error loading azd env")
-    env_json = json.loads(result.stdout)
-    env_file_path = None
-    for entry in env_json:
-        if entry["IsDefault"]:
-            env_file_path = entry["DotEnvPath"]
+    env_file_path = find_default_azd_env_file()
+    if not env_file_path:
+        # Fall back to asking azd, e.g. when run outside the project root
+        result = subprocess.run("azd env list -o json", shell=True, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise Exception("Error loading azd env")
+        env_json = json.loads(result.stdout)
+        for entry in env_json:
+            if entry["IsDefault"]:
+                env_file_path = entry["DotEnvPath"]
     if not env_file_path:
         raise Exception("No default azd env file found")
     logger.info(f"Loading azd env from {env_file_path}")
     load_dotenv(env_file_path, override=True)
 
 
+@lru_cache(maxsize=128)
 def minutes_to_iso8601_duration(minutes: int) -> str:
     """Convert minutes to ISO 8601 duration format (e.g., PT60M for 60 minutes)."""
-    if minutes < 5:
-        minutes = 5  # Minimum interval is 5 minutes
-    if minutes >= 1440:
-        # For 24+ hours, use days
-        days = minutes // 1440
-        remaining_minutes = minutes % 1440
-        if remaining_minutes == 0:
-            return f"P{days}D"
-        else:
-            hours = remaining_minutes // 60
-            mins = remaining_minutes % 60
-            if mins == 0:
-                return f"P{days}DT{hours}H"
-            else:
-                return f"P{days}DT{hours}H{mins}M"
-    elif minutes >= 60:
-        # For 1+ hours, use hours and minutes
-        hours = minutes // 60
-        mins = minutes % 60
-        if mins == 0:
-            return f"PT{hours}H"
-        else:
-            return f"PT{hours}H{mins}M"
-    else:
-        # For less than 1 hour, use minutes only
-        return f"PT{minutes}M"
+    minutes = max(minutes, 5)  # Minimum interval is 5 minutes
+    days, remaining_minutes = divmod(minutes, 1440)
+    hours, mins = divmod(remaining_minutes, 60)
+    duration = f"P{days}D" if days else "P"
+    if remaining_minutes:
+        # Hours are spelled out whenever a larger unit precedes them (e.g. P1DT0H30M)
+        duration += "T"
+        if days or hours:
+            duration += f"{hours}H"
+        if mins:
+            duration += f"{mins}M"
+    return duration
+
 
+def setup_index(index_client, indexer_client, index_name, azure_storage_connection_string, azure_storage_container, azure_openai_embedding_endpoint, azure_openai_embedding_deployment, azure_openai_embedding_model, azure_openai_embeddings_dimensions):
 
-def setup_index(azure_credential, index_name, azure_search_endpoint, azure_storage_connection_string, azure_storage_container, azure_openai_embedding_endpoint, azure_openai_embedding_deployment, azure_openai_embedding_model, azure_openai_embeddings_dimensions):
-    index_client = SearchIndexClient(azure_search_endpoint, azure_credential)
-    indexer_client = SearchIndexerClient(azure_search_endpoint, azure_credential)
+    # The four listings are independent GETs, so fetch them concurrently instead of one round trip after another.
+    # They return full definitions, so the index and indexer checks below reuse them rather than fetching again.
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        data_sources_future = executor.submit(indexer_client.get_data_source_connections)
+        indexes_future = executor.submit(lambda: {index.name: index for index in index_client.list_indexes()})
+        skillsets_future = executor.submit(indexer_client.get_skillsets)
+        indexers_future = executor.submit(indexer_client.get_indexers)
+    data_source_connections = data_sources_future.result()
+    indexes = indexes_future.result()
+    skillsets = skillsets_future.result()
+    indexers = indexers_future.result()
 
-    data_source_connections = indexer_client.get_data_source_connections()
-    if index_name in [ds.name for ds in data_source_connections]:
+    if index_name in {ds.name for ds in data_source_connections}:
         logger.info(f"Data source connection {index_name} already exists, not re-creating")
     else:
         logger.info(f"Creating data source connection: {index_name}")
@@ -106,16 +149,21 @@ def setup_index(azure_credential, index_name, azure_search_endpoint, azure_stora
                 connection_string=azure_storage_connection_string,
                 container=SearchIndexerDataContainer(name=azure_storage_container)))
 
-    index_names = [index.name for index in index_client.list_indexes()]
     index_needs_update = False
     
-    if index_name in index_names:
+    if index_name in indexes:
         logger.info(f"Index {index_name} already exists, checking if it needs updates...")
-        # Check if index has required parent_id field
-        existing_index = index_client.get_index(index_name)
-        existing_field_names = [field.name for field in existing_index.fields]
+        # Check if index has required parent_id field and vectors of the configured size
+        existing_index = indexes[index_name]
+        existing_field_names = {field.name for field in existing_index.fields}
+        existing_dimensions = next((field.vector_search_dimensions for field in existing_index.fields if field.name == "text_vector"), None)
+        recreate_reason = None
         if "parent_id" not in existing_field_names:
-            logger.warning(f"Index {index_name} is missing 'parent_id' field required for index projections. Index will be recreated.")
+            recreate_reason = "is missing 'parent_id' field required for index projections"
+        elif existing_dimensions != azure_openai_embeddings_dimensions:
+            recreate_reason = f"stores {existing_dimensions}-dimension vectors, expected {azure_openai_embeddings_dimensions}"
+        if recreate_reason:
+            logger.warning(f"Index {index_name} {recreate_reason}. Index will be recreated and all documents re-indexed.")
             # Delete the existing index so we can recreate it with the correct schema
             try:
                 index_client.delete_index(index_name)
@@ -127,7 +175,7 @@ def setup_index(azure_credential, index_name, azure_search_endpoint, azure_stora
         else:
             logger.info(f"Index {index_name} has all required fields")
     
-    if index_name not in index_names or index_needs_update:
+    if index_name not in indexes or index_needs_update:
         logger.info(f"Creating index: {index_name}")
         index_client.create_index(
             SearchIndex(
@@ -140,7 +188,7 @@ def setup_index(azure_credential, index_name, azure_search_endpoint, azure_stora
                     SearchField(
                         name="text_vector", 
                         type=SearchFieldDataType.Collection(SearchFieldDataType.Single),
-                        vector_search_dimensions=EMBEDDINGS_DIMENSIONS,
+                        vector_search_dimensions=azure_openai_embeddings_dimensions,
                         vector_search_profile_name="vp",
                         stored=True,
                         hidden=False)
@@ -159,8 +207,18 @@ def setup_index(azure_credential, index_name, azure_search_endpoint, azure_stora
                             )
                         )
                     ],
+                    # int8 scalar quantization keeps the HNSW graph at a quarter of the float32 size; full-precision
+                    # vectors are kept for rescoring the oversampled candidates
+                    compressions=[
+                        ScalarQuantizationCompressionConfiguration(
+                            name="sq",
+                            rerank_with_original_vectors=True,
+                            default_oversampling=4,
+                            parameters=ScalarQuantizationParameters(quantized_data_type=VectorSearchCompressionTargetDataType.INT8)
+                        )
+                    ],
                     profiles=[
-                        VectorSearchProfile(name="vp", algorithm_configuration_name="algo", vectorizer="openai_vectorizer")
+                        VectorSearchProfile(name="vp", algorithm_configuration_name="algo", vectorizer="openai_vectorizer", compression_configuration_name="sq")
                     ]
                 ),
                 semantic_search=SemanticSearch(
@@ -175,8 +233,7 @@ def setup_index(azure_credential, index_name, azure_search_endpoint, azure_stora
             )
         )
 
-    skillsets = indexer_client.get_skillsets()
-    skillset_exists = index_name in [skillset.name for skillset in skillsets]
+    skillset_exists = index_name in {skillset.name for skillset in skillsets}
     
     # If index was recreated, we need to recreate the skillset too
     if skillset_exists and index_needs_update:
@@ -231,24 +288,29 @@ def setup_index(azure_credential, index_name, azure_search_endpoint, azure_stora
                 )))
 
     # If index was recreated, we need to delete and recreate indexers too
-    indexers = indexer_client.get_indexers()
-    indexer_exists = False
+    deleted_indexer_names = set()
     if index_needs_update:
-        # Delete any existing indexers that reference this index
-        for indexer in indexers:
-            if indexer.target_index_name == index_name:
-                logger.info(f"Deleting indexer {indexer.name} because index was recreated...")
+        # Delete any existing indexers that reference this index, in parallel since each delete is its own round trip
+        stale_indexer_names = [indexer.name for indexer in indexers if indexer.target_index_name == index_name]
+        with ThreadPoolExecutor(max_workers=DELETE_MAX_WORKERS) as executor:
+            futures = {}
+            for name in stale_indexer_names:
+                logger.info(f"Deleting indexer {name} because index was recreated...")
+                futures[executor.submit(indexer_client.delete_indexer, name)] = name
+            for future in as_completed(futures):
+                name = futures[future]
                 try:
-                    indexer_client.delete_indexer(indexer.name)
-                    logger.info(f"Deleted indexer {indexer.name}")
+                    future.result()
+                    deleted_indexer_names.add(name)
+                    logger.info(f"Deleted indexer {name}")
                 except Exception as e:
-                    logger.warning(f"Failed to delete indexer {indexer.name}: {e}")
+                    logger.warning(f"Failed to delete indexer {name}: {e}")
+    # The indexer list was fetched before the deletes above, so the listed definition is only reused when the indexer
+    # wasn't deleted in this run; a deleted one is created again below
     existing_indexer = None
-    for idx in indexers:
-        if idx.name == index_name:
-            indexer_exists = True
-            existing_indexer = idx
-            break
+    if index_name not in deleted_indexer_names:
+        existing_indexer = next((idx for idx in indexers if idx.name == index_name), None)
+    indexer_exists = existing_indexer is not None
     
     # Get schedule interval from environment (default: 1 hour)
     schedule_interval_minutes = int(os.environ.get("AZURE_SEARCH_INDEXER_SCHEDULE_MINUTES", "60"))
@@ -256,15 +318,14 @@ def setup_index(azure_credential, index_name, azure_search_endpoint, azure_stora
     
     if indexer_exists:
         logger.info(f"Indexer {index_name} already exists")
-        # Get full indexer details and update with schedule if it doesn't have one
+        # Update the listed indexer with a schedule if it doesn't have one
         try:
-            full_indexer = indexer_client.get_indexer(index_name)
-            if full_indexer.schedule is None:
+            if existing_indexer.schedule is None:
                 logger.info(f"Adding schedule to existing indexer (runs every {schedule_interval_minutes} minutes)")
-                full_indexer.schedule = IndexingSchedule(interval=schedule_interval_iso8601)
-                indexer_client.create_or_update_indexer(full_indexer)
+                existing_indexer.schedule = IndexingSchedule(interval=schedule_interval_iso8601)
+                indexer_client.create_or_update_indexer(existing_indexer)
             else:
-                logger.info(f"Indexer already has a schedule: {full_indexer.schedule.interval}")
+                logger.info(f"Indexer already has a schedule: {existing_indexer.schedule.interval}")
         except Exception as e:
             logger.warning(f"Could not update indexer schedule: {e}")
     else:
@@ -280,28 +341,54 @@ def setup_index(azure_credential, index_name, azure_search_endpoint, azure_stora
             )
         )
 
-def upload_documents(azure_credential, indexer_name, azure_search_endpoint, azure_storage_endpoint, azure_storage_container):
-    indexer_client = SearchIndexerClient(azure_search_endpoint, azure_credential)
+def upload_file(container_client, filename, path):
+    logger.info("Uploading blob for file: %s", filename)
+    with open(path, "rb") as opened_file:
+        file_size = os.fstat(opened_file.fileno()).st_size
+        if file_size == 0:
+            # Empty files can't be memory-mapped
+            container_client.upload_blob(filename, b"", overwrite=True)
+            return
+        # Small files are a single put, so block parallelism only applies to files split into blocks
+        max_concurrency = BLOCK_MAX_CONCURRENCY if file_size > SINGLE_PUT_THRESHOLD else 1
+        # The SDK reads blocks straight from the page cache instead of copying through file read buffers; mmap
+        # supports read/seek/tell, which is what the SDK's parallel block reader uses to read each block's range
+        with mmap.mmap(opened_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            container_client.upload_blob(
+                filename, mapped, overwrite=True, length=file_size, max_concurrency=max_concurrency
+            )
+
+def upload_documents(azure_credential, indexer_client, indexer_name, azure_storage_endpoint, azure_storage_container, http_session):
     # Upload the documents in /data folder to the blob storage container
     blob_client = BlobServiceClient(
         account_url=azure_storage_endpoint, credential=azure_credential,
-        max_single_put_size=4 * 1024 * 1024
+        transport=RequestsTransport(session=http_session, session_owner=False),
+        max_single_put_size=SINGLE_PUT_THRESHOLD, max_block_size=BLOCK_SIZE
     )
     container_client = blob_client.get_container_client(azure_storage_container)
     if not container_client.exists():
         container_client.create_container()
-    existing_blobs = [blob.name for blob in container_client.list_blobs()]
+    existing_blobs = {blob.name for blob in container_client.list_blobs()}
 
-    # Open each file in /data folder
+    # Collect the files in /data folder that don't have a blob yet
+    files_to_upload = []
     for file in os.scandir("data"):
-        with open(file.path, "rb") as opened_file:
-            filename = os.path.basename(file.path)
-            # Check if blob already exists
-            if filename in existing_blobs:
-                logger.info("Blob already exists, skipping file: %s", filename)
-            else:
-                logger.info("Uploading blob for file: %s", filename)
-                blob_client = container_client.upload_blob(filename, opened_file, overwrite=True)
+        # DirEntry.is_file() answers from the directory listing, so subfolders are skipped without an extra stat
+        if not file.is_file():
+            continue
+        if file.name in existing_blobs:
+            logger.info("Blob already exists, skipping file: %s", file.name)
+        else:
+            files_to_upload.append((file.stat().st_size, file.name, file.path))
+
+    # Start the largest files first so a big file submitted last doesn't leave one upload running on its own at the end
+    files_to_upload.sort(reverse=True)
+
+    # Uploads are independent and network-bound, so run them in parallel
+    with ThreadPoolExecutor(max_workers=UPLOAD_MAX_WORKERS) as executor:
+        futures = [executor.submit(upload_file, container_client, filename, path) for _, filename, path in files_to_upload]
+        for future in as_completed(futures):
+            future.result()
 
     # Start the indexer
     try:
@@ -331,7 +418,9 @@ if __name__ == "__main__":
     AZURE_OPENAI_EMBEDDING_ENDPOINT = os.environ["AZURE_OPENAI_ENDPOINT"]
     AZURE_OPENAI_EMBEDDING_DEPLOYMENT = os.environ["AZURE_OPENAI_EMBEDDING_DEPLOYMENT"]
     AZURE_OPENAI_EMBEDDING_MODEL = os.environ["AZURE_OPENAI_EMBEDDING_MODEL"]
-    EMBEDDINGS_DIMENSIONS = 3072
+    # text-embedding-3 models support shortened embeddings; 1024 dimensions keep most of the retrieval quality of 3072.
+    # An existing index built with another size is deleted and recreated, so every document is re-embedded on upgrade.
+    EMBEDDINGS_DIMENSIONS = 1024
     AZURE_SEARCH_ENDPOINT = os.environ["AZURE_SEARCH_ENDPOINT"]
     AZURE_STORAGE_ENDPOINT = os.environ["AZURE_STORAGE_ENDPOINT"]
     AZURE_STORAGE_CONNECTION_STRING = os.environ["AZURE_STORAGE_CONNECTION_STRING"]
@@ -339,9 +428,15 @@ if __name__ == "__main__":
 
     azure_credential = AzureDeveloperCliCredential(tenant_id=os.environ["AZURE_TENANT_ID"], process_timeout=60)
 
-    setup_index(azure_credential,
+    # One pooled keep-alive session and one pair of search clients serve both setup steps
+    http_session = create_http_session()
+    index_client = SearchIndexClient(AZURE_SEARCH_ENDPOINT, azure_credential,
+        transport=RequestsTransport(session=http_session, session_owner=False))
+    indexer_client = SearchIndexerClient(AZURE_SEARCH_ENDPOINT, azure_credential,
+        transport=RequestsTransport(session=http_session, session_owner=False))
+
+    setup_index(index_client, indexer_client,
         index_name=AZURE_SEARCH_INDEX, 
-        azure_search_endpoint=AZURE_SEARCH_ENDPOINT,
         azure_storage_connection_string=AZURE_STORAGE_CONNECTION_STRING,
         azure_storage_container=AZURE_STORAGE_CONTAINER,
         azure_openai_embedding_endpoint=AZURE_OPENAI_EMBEDDING_ENDPOINT,
@@ -349,8 +444,8 @@ if __name__ == "__main__":
         azure_openai_embedding_model=AZURE_OPENAI_EMBEDDING_MODEL,
         azure_openai_embeddings_dimensions=EMBEDDINGS_DIMENSIONS)
 
-    upload_documents(azure_credential,
+    upload_documents(azure_credential, indexer_client,
         indexer_name=AZURE_SEARCH_INDEX,
-        azure_search_endpoint=AZURE_SEARCH_ENDPOINT,
         azure_storage_endpoint=AZURE_STORAGE_ENDPOINT,
-        azure_storage_container=AZURE_STORAGE_CONTAINER)
\ No newline at end of file
+        azure_storage_container=AZURE_STORAGE_CONTAINER,
+        http_session=http_session)
\ No newline at end of file
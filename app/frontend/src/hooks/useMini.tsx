@@ -3,7 +3,7 @@ import { useState, useCallback } from "react";
 type Parameters = {
     onTranscriptionComplete?: (text: string) => void;
     onChatResponse?: (text: string, toolResults?: any[]) => void;
-    onAudioReceived?: (audioBase64: string) => void;
+    onAudioReceived?: (audio: ArrayBuffer) => void;
     onError?: (error: string) => void;
 };
 
@@ -145,12 +145,11 @@ export default function useMini({
                 throw new Error(`${errorMsg}${errorType}${details}`);
             }
 
-            const data = await response.json();
-            const audioBase64 = data.audio;
-            console.log("[useMini] Speech synthesis successful, audio size:", audioBase64.length, "chars");
+            const audio = await response.arrayBuffer();
+            console.log("[useMini] Speech synthesis successful, audio size:", audio.byteLength, "bytes");
             
-            onAudioReceived?.(audioBase64);
-            return audioBase64;
+            onAudioReceived?.(audio);
+            return audio;
         } catch (error: any) {
             const errorMessage = error.message || "Speech synthesis failed";
             console.error("[useMini] Speech synthesis error:", errorMessage, error);
@@ -131,6 +131,9 @@ export default function useRealTime({
                 console.log("[useRealtime] Tool response received:", message);
                 onReceivedExtensionMiddleTierToolResponse?.(message as ExtensionMiddleTierToolResponse);
                 break;
+            case "extension.middle_tier_tool_item":
+                // Ids of hidden tool items, only needed by clients that delete their conversation items
+                break;
             case "error":
                 console.error("[useRealtime] Error message:", message);
                 onReceivedError?.(message);
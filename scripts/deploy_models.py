@@ -4,9 +4,12 @@ Deploy Azure AI Foundry models using Python SDK.
 This script provides an alternative to the bash script for deploying models.
 """
 
+import json
 import os
+import re
 import sys
 import subprocess
+from functools import lru_cache
 from pathlib import Path
 
 try:
@@ -23,44 +26,61 @@ except ImportError:
     print("Install with: pip install azure-identity azure-mgmt-cognitiveservices")
     sys.exit(1)
 
+# KEY=value assignments in an azd .env file; comments and blank lines never match
+ENV_LINE_PATTERN = re.compile(r"^[ \t]*([A-Za-z_][A-Za-z0-9_]*)=(.*?)[ \t\r]*$", re.MULTILINE)
 
-def get_azd_env_value(key: str) -> str:
-    """Get environment variable from azd."""
+
+@lru_cache(maxsize=1)
+def get_azd_env_values() -> dict:
+    """Get all azd environment values with a single azd call."""
     try:
         result = subprocess.run(
-            ["azd", "env", "get-value", key],
+            ["azd", "env", "get-values"],
             capture_output=True,
             text=True,
             check=True,
         )
-        return result.stdout.strip()
     except (subprocess.CalledProcessError, FileNotFoundError):
-        return ""
+        return {}
+    values = {}
+    for line in result.stdout.splitlines():
+        if "=" in line:
+            key, value = line.split("=", 1)
+            values[key.strip()] = value.strip().strip('"')
+    return values
+
+
+def get_azd_env_value(key: str) -> str:
+    """Get environment variable, asking azd only if the loaded .env file didn't provide it."""
+    return os.environ.get(key) or get_azd_env_values().get(key, "")
 
 
 def load_env_from_file():
     """Load environment variables from azd .env file."""
+    env_name = os.environ.get("AZURE_ENV_NAME")
+    if not env_name:
+        # azd records the selected environment here, so the right .env is found without calling azd
+        try:
+            env_name = json.loads(Path(".azure/config.json").read_text()).get("defaultEnvironment")
+        except (OSError, ValueError):
+            env_name = None
     env_files = [
         Path(".azure/.env"),
-        Path(f".azure/{os.environ.get('AZURE_ENV_NAME', 'default')}/.env"),
+        Path(f".azure/{env_name or 'default'}/.env"),
     ]
     
     for env_file in env_files:
         if env_file.exists():
-            with open(env_file) as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith("#") and "=" in line:
-                        key, value = line.split("=", 1)
-                        os.environ[key] = value.strip('"')
+            for match in ENV_LINE_PATTERN.finditer(env_file.read_text()):
+                os.environ[match.group(1)] = match.group(2).strip('"')
             break
 
 
 def get_service_info():
     """Get OpenAI service name and resource group."""
     # Load from azd
-    endpoint = get_azd_env_value("AZURE_OPENAI_ENDPOINT") or os.environ.get("AZURE_OPENAI_ENDPOINT", "")
-    resource_group = get_azd_env_value("AZURE_RESOURCE_GROUP") or os.environ.get("AZURE_RESOURCE_GROUP", "")
+    endpoint = get_azd_env_value("AZURE_OPENAI_ENDPOINT")
+    resource_group = get_azd_env_value("AZURE_RESOURCE_GROUP")
     
     # Extract service name from endpoint
     service_name = ""
@@ -94,21 +114,38 @@ def get_service_info():
     return service_name, resource_group
 
 
-def deploy_model(client, resource_group: str, service_name: str, deployment_name: str, model_name: str, sku_name: str = "Standard", capacity: int = 1):
-    """Deploy a model using Azure AI Foundry."""
-    print(f"Checking if deployment '{deployment_name}' already exists...")
-    
-    try:
-        # Check if deployment exists
-        existing = client.deployments.get(
+def list_deployment_names(client, resource_group: str, service_name: str) -> set:
+    """Get the names of all deployments on the service in one call."""
+    return {
+        deployment.name
+        for deployment in client.deployments.list(
             resource_group_name=resource_group,
             account_name=service_name,
-            deployment_name=deployment_name,
         )
-        print(f"  ✓ Deployment '{deployment_name}' already exists, skipping...")
-        return True
-    except Exception:
-        pass  # Deployment doesn't exist, continue
+    }
+
+
+def deploy_model(client, resource_group: str, service_name: str, deployment_name: str, model_name: str, sku_name: str = "Standard", capacity: int = 1, existing_deployments: set = None):
+    """Deploy a model using Azure AI Foundry."""
+    print(f"Checking if deployment '{deployment_name}' already exists...")
+    
+    if existing_deployments is not None:
+        # Already known from a single listing, so no per-model lookup is needed
+        if deployment_name in existing_deployments:
+            print(f"  ✓ Deployment '{deployment_name}' already exists, skipping...")
+            return True
+    else:
+        try:
+            # Check if deployment exists
+            client.deployments.get(
+                resource_group_name=resource_group,
+                account_name=service_name,
+                deployment_name=deployment_name,
+            )
+            print(f"  ✓ Deployment '{deployment_name}' already exists, skipping...")
+            return True
+        except Exception:
+            pass  # Deployment doesn't exist, continue
     
     print(f"  Deploying '{deployment_name}' (model: {model_name})...")
     
@@ -182,17 +219,25 @@ def main():
         print("Make sure you're logged in: az login")
         sys.exit(1)
     
+    # One listing answers the existence check for every model. Creates stay sequential because the
+    # service rejects concurrent deployment operations on the same account with a conflict error.
+    try:
+        existing_deployments = list_deployment_names(client, resource_group, service_name)
+    except Exception as e:
+        print(f"Could not list existing deployments, checking each model instead: {e}")
+        existing_deployments = None
+    
     # Deploy models
     results = []
     
     print("=== Deploying gpt-realtime-mini (transcription and text-to-speech) ===")
-    results.append(deploy_model(client, resource_group, service_name, "gpt-realtime-mini", "gpt-realtime-mini", sku_name="GlobalStandard"))
+    results.append(deploy_model(client, resource_group, service_name, "gpt-realtime-mini", "gpt-realtime-mini", sku_name="GlobalStandard", existing_deployments=existing_deployments))
     
     print("\n=== Deploying gpt-5-mini (chat) ===")
-    results.append(deploy_model(client, resource_group, service_name, "gpt-5-mini", "gpt-5-mini", sku_name="GlobalStandard"))
+    results.append(deploy_model(client, resource_group, service_name, "gpt-5-mini", "gpt-5-mini", sku_name="GlobalStandard", existing_deployments=existing_deployments))
     
     print("\n=== Deploying text-embedding-3-large (embeddings) ===")
-    results.append(deploy_model(client, resource_group, service_name, "text-embedding-3-large", "text-embedding-3-large", sku_name="Standard", capacity=30))
+    results.append(deploy_model(client, resource_group, service_name, "text-embedding-3-large", "text-embedding-3-large", sku_name="Standard", capacity=30, existing_deployments=existing_deployments))
     
     # Summary
     print("\n=== Deployment Summary ===")
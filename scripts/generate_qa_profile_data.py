@@ -16,27 +16,66 @@ Environment:
 
 import argparse
 import asyncio
-import base64
+import hashlib
+import io
 import json
 import logging
 import os
+import re
 import shutil
 import ssl
+import subprocess
 import sys
+import time
+import uuid
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+from typing import BinaryIO
 
 # Add app/backend to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent / "app" / "backend"))
 
-import io
-
+import tiktoken
 import websockets
 from dotenv import load_dotenv
-from openai import AzureOpenAI
-from pydub import AudioSegment
+from openai import AsyncAzureOpenAI
 from pypdf import PdfReader
 from requests import Session
 
+# orjson serializes records and parses realtime events several times faster than json when installed
+# (it ships with the backend requirements)
+try:
+    import orjson
+
+    load_json = orjson.loads
+
+    def dump_jsonl_line(record: dict) -> bytes:
+        """Serialize a record as one UTF-8 JSONL line."""
+        return orjson.dumps(record) + b"\n"
+except ImportError:
+    load_json = json.loads
+    # json.dumps builds a new encoder per call when given options, so keep one; compact like orjson's output
+    _encode_record = json.JSONEncoder(ensure_ascii=False, check_circular=False, separators=(",", ":")).encode
+
+    def dump_jsonl_line(record: dict) -> bytes:
+        """Serialize a record as one UTF-8 JSONL line."""
+        return (_encode_record(record) + "\n").encode("utf-8")
+
+# lameenc encodes MP3 in-process when installed, so answers don't each need an ffmpeg subprocess
+try:
+    import lameenc
+except ImportError:
+    lameenc = None
+
+# pybase64 decodes with SIMD when installed; the realtime audio deltas are the bulk of what gets decoded
+try:
+    from pybase64 import b64decode
+except ImportError:
+    from base64 import b64decode
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(levelname)s - %(message)s",
@@ -47,115 +86,307 @@ logger = logging.getLogger("generate_qa_profile")
 for _logger in ("azure.identity", "azure.core", "urllib3.connectionpool"):
     logging.getLogger(_logger).setLevel(logging.WARNING)
 
+# ffmpeg raw input format for each PCM sample width in bytes
+PCM_FFMPEG_FORMATS = {1: "u8", 2: "s16le", 4: "s32le"}
+
+# Average kbps of LAME VBR quality 0-9, used as the constant bit rate when encoding with lameenc
+LAME_VBR_BITRATES = (245, 225, 190, 175, 165, 130, 115, 100, 85, 65)
+# Highest MP3 bit rate allowed below 32 kHz (MPEG-2 Layer III), which covers realtime-mini's 24 kHz audio
+MPEG2_MAX_BITRATE = 160
+
+# Longest wait for the final answer to a question over the realtime WebSocket
+REALTIME_RESPONSE_TIMEOUT_SECONDS = 60
+
+# Longest wait for the realtime session to confirm a turn's items were deleted before the next turn starts
+REALTIME_DELETE_TIMEOUT_SECONDS = 10
 
-def load_document_content(data_dir: Path) -> str:
+# Written JSONL records are flushed to disk after every this many
+JSONL_FLUSH_EVERY = 10
+
+# Questions are requested in batches of this size, with this many batch requests in flight at once
+QUESTION_BATCH_SIZE = 10
+QUESTION_BATCH_CONCURRENCY = 3
+
+# Document tokens given to each question batch; longer documents are split into windows overlapping by this much
+QUESTION_WINDOW_TOKENS = 12000
+QUESTION_WINDOW_OVERLAP_TOKENS = 1000
+
+# Question type each batch leans towards, in rotation, so batches over the same documents don't repeat each other
+QUESTION_FOCUSES = ("factual", "procedural", "comparison", "policy-related", "definition", "scenario-based")
+
+# Leading "1. ", "1) " or "1: " of a numbered list entry; the trailing whitespace keeps "1.5 million" intact
+NUMBERED_LINE_PREFIX = re.compile(r"^\d+\s*[.):]\s+")
+
+
+def content_hash(*parts: str | bytes) -> str:
+    """SHA-256 over the given parts, used as the key for cached results."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8") if isinstance(part, str) else part)
+        # Separate parts so ("ab", "c") and ("a", "bc") hash differently
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def extract_pdf_text(pdf_bytes: bytes) -> str:
+    """Extract the text of every page of an in-memory PDF."""
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def load_document_content(data_dir: Path, cache_dir: Path | None = None) -> str:
     """Load and concatenate text content from all documents in data folder."""
-    content_parts = []
+    texts = {}
+    # PDFs whose text isn't cached yet, as (file path, cache path, file bytes)
+    pending_pdfs = []
     for file_path in sorted(data_dir.iterdir()):
         if file_path.is_file() and not file_path.name.startswith("."):
             try:
                 if file_path.suffix.lower() == ".md":
-                    text = file_path.read_text(encoding="utf-8", errors="replace")
+                    texts[file_path] = file_path.read_text(encoding="utf-8", errors="replace")
                 elif file_path.suffix.lower() == ".pdf":
-                    reader = PdfReader(file_path)
-                    text = "\n".join(
-                        page.extract_text() or "" for page in reader.pages
-                    )
-                else:
-                    continue
-                if text.strip():
-                    content_parts.append(f"--- {file_path.name} ---\n{text}")
+                    pdf_bytes = file_path.read_bytes()
+                    cache_path = cache_dir / "pdf" / f"{content_hash(pdf_bytes)}.txt" if cache_dir else None
+                    if cache_path and cache_path.exists():
+                        texts[file_path] = cache_path.read_text(encoding="utf-8")
+                    else:
+                        pending_pdfs.append((file_path, cache_path, pdf_bytes))
             except Exception as e:
                 logger.warning(f"Could not read {file_path.name}: {e}")
-    return "\n\n".join(content_parts)
+
+    # Text extraction is CPU-bound, so spread several PDFs over processes; a single one isn't worth the pool startup
+    if len(pending_pdfs) >= 2:
+        with ProcessPoolExecutor(max_workers=min(len(pending_pdfs), os.cpu_count() or 1)) as executor:
+            futures = [executor.submit(extract_pdf_text, pdf_bytes) for _, _, pdf_bytes in pending_pdfs]
+    else:
+        futures = None
+    for index, (file_path, cache_path, pdf_bytes) in enumerate(pending_pdfs):
+        try:
+            text = futures[index].result() if futures else extract_pdf_text(pdf_bytes)
+        except Exception as e:
+            logger.warning(f"Could not read {file_path.name}: {e}")
+            continue
+        texts[file_path] = text
+        if cache_path:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            cache_path.write_text(text, encoding="utf-8")
+
+    return "\n\n".join(
+        f"--- {file_path.name} ---\n{texts[file_path]}"
+        for file_path in sorted(texts)
+        if texts[file_path].strip()
+    )
+
+
+def parse_numbered_lines(text: str) -> list[str]:
+    """Split a numbered list from the model into its entries without the numbers."""
+    questions = []
+    for line in text.splitlines():
+        # Remove leading number (e.g., "1. " or "1)")
+        line = NUMBERED_LINE_PREFIX.sub("", line.strip(), count=1).strip()
+        if line:
+            questions.append(line)
+    return questions
 
 
-def generate_questions(
-    client: AzureOpenAI,
+@lru_cache
+def get_encoding(deployment: str) -> tiktoken.Encoding:
+    """Tokenizer for the deployment's model, falling back to the encoding of current OpenAI models for unknown names."""
+    try:
+        return tiktoken.encoding_for_model(deployment)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def split_into_windows(text: str, deployment: str) -> list[str]:
+    """Split text into overlapping windows of at most QUESTION_WINDOW_TOKENS tokens."""
+    encoding = get_encoding(deployment)
+    tokens = encoding.encode(text)
+    if len(tokens) <= QUESTION_WINDOW_TOKENS:
+        return [text]
+    step = QUESTION_WINDOW_TOKENS - QUESTION_WINDOW_OVERLAP_TOKENS
+    return [
+        encoding.decode(tokens[start:start + QUESTION_WINDOW_TOKENS])
+        for start in range(0, len(tokens) - QUESTION_WINDOW_OVERLAP_TOKENS, step)
+    ]
+
+
+async def generate_questions(
+    client: AsyncAzureOpenAI,
     document_content: str,
     count: int,
     deployment: str = "gpt-5-mini",
+    cache_dir: Path | None = None,
 ) -> list[str]:
-    """Use Azure OpenAI to generate diverse questions based on document content."""
-    # Truncate if very long (keep first ~50k chars)
-    max_chars = 50000
-    if len(document_content) > max_chars:
-        document_content = document_content[:max_chars] + "\n\n[... truncated ...]"
+    """Use Azure OpenAI to generate diverse questions based on document content, in concurrent batches."""
+    # Small batches keep each response short and within rate limits, and run side by side.
+    # The documents come first so batches over the same window share a prompt prefix, which the service caches.
+    batch_sizes = [min(QUESTION_BATCH_SIZE, count - start) for start in range(0, count, QUESTION_BATCH_SIZE)]
 
-    prompt = f"""Based on the following document content, generate exactly {count} diverse questions that a user might ask about this information.
-Each question should be answerable from the documents. Vary the question types: factual, procedural, comparison, policy-related, etc.
-Return ONLY the questions, one per line, numbered 1-{count}. No other text.
+    # Long documents are split by tokens rather than cut off, and batches are spread over the windows so
+    # questions cover the whole document instead of only its beginning
+    windows = split_into_windows(document_content, deployment)
+    if len(windows) > len(batch_sizes):
+        batch_windows = [windows[batch * len(windows) // len(batch_sizes)] for batch in range(len(batch_sizes))]
+    else:
+        batch_windows = [windows[batch % len(windows)] for batch in range(len(batch_sizes))]
+
+    prompts = [
+        f"""Document content:
+{batch_windows[batch]}
 
-Document content:
-{document_content}
+Based on the document content above, generate exactly {batch_size} diverse questions that a user might ask about this information.
+Each question should be answerable from the documents. Vary the question types: factual, procedural, comparison, policy-related, etc.
+Favor {QUESTION_FOCUSES[batch % len(QUESTION_FOCUSES)]} questions.
+Return ONLY the questions, one per line, numbered 1-{batch_size}. No other text.
 """
+        for batch, batch_size in enumerate(batch_sizes)
+    ]
 
-    response = client.chat.completions.create(
-        model=deployment,
-        messages=[{"role": "user", "content": prompt}],
-    )
-    text = response.choices[0].message.content or ""
+    # The prompts cover the documents, the count and the instructions, so any change to them misses the cache
+    cache_path = cache_dir / "questions" / f"{content_hash(*prompts, deployment)}.json" if cache_dir else None
+    if cache_path and cache_path.exists():
+        logger.info(f"Reusing cached questions: {cache_path.name}")
+        return json.loads(cache_path.read_text(encoding="utf-8"))
+
+    semaphore = asyncio.Semaphore(QUESTION_BATCH_CONCURRENCY)
+
+    async def generate_batch(prompt: str) -> list[str]:
+        async with semaphore:
+            response = await client.chat.completions.create(
+                model=deployment,
+                messages=[{"role": "user", "content": prompt}],
+            )
+        return parse_numbered_lines(response.choices[0].message.content or "")
+
+    batches = await asyncio.gather(*(generate_batch(prompt) for prompt in prompts))
+
+    # Batches can overlap, so keep only the first occurrence of each question
     questions = []
-    for line in text.strip().split("\n"):
-        line = line.strip()
-        # Remove leading number (e.g., "1. " or "1)")
-        if line:
-            for sep in (". ", ") ", ": "):
-                if sep in line and line.split(sep)[0].strip().isdigit():
-                    line = line.split(sep, 1)[1].strip()
-                    break
-            questions.append(line)
-    return questions[:count]
+    seen = set()
+    for batch_questions, batch_size in zip(batches, batch_sizes):
+        for question in batch_questions[:batch_size]:
+            key = " ".join(question.lower().split())
+            if key not in seen:
+                seen.add(key)
+                questions.append(question)
+    if len(questions) < count:
+        logger.warning(f"Generated {len(questions)} unique questions, fewer than the {count} requested")
+    if cache_path:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(json.dumps(questions, ensure_ascii=False), encoding="utf-8")
+    return questions
 
 
+@lru_cache(maxsize=1)
 def check_ffmpeg_available() -> bool:
-    """Check if ffmpeg is available in the system PATH."""
+    """Check if ffmpeg is available in the system PATH, searching it only once per run."""
     return shutil.which("ffmpeg") is not None
 
 
-def convert_pcm_to_mp3(pcm_data: bytes, sample_rate: int = 24000, channels: int = 1, sample_width: int = 2) -> bytes:
-    """Convert PCM16 audio data to MP3 format.
-    
+class Mp3StreamEncoder:
+    """Encode PCM audio to MP3 as it arrives, so the whole PCM stream never has to be buffered.
+
+    Uses lameenc in-process when it is installed and the audio is 16-bit, otherwise an ffmpeg pipe.
+    lameenc encodes at the constant bit rate matching the VBR quality's average.
+
     Args:
-        pcm_data: Raw PCM16 audio bytes
         sample_rate: Sample rate in Hz (default: 24000 for realtime-mini)
         channels: Number of audio channels (default: 1 for mono)
         sample_width: Sample width in bytes (default: 2 for 16-bit)
-    
-    Returns:
-        MP3 audio data as bytes
-    
-    Raises:
-        FileNotFoundError: If ffmpeg is not installed
-        Exception: If conversion fails for other reasons
+        vbr_quality: LAME VBR quality from 0 (best, ~245 kbps) to 9 (smallest, ~65 kbps).
+            The default of 5 (~130 kbps) is transparent for speech.
     """
-    if not check_ffmpeg_available():
-        raise FileNotFoundError(
-            "ffmpeg is not installed or not in PATH. "
-            "Please install ffmpeg:\n"
-            "  macOS: brew install ffmpeg\n"
-            "  Linux: sudo apt-get install ffmpeg\n"
-            "  Windows: Download from https://ffmpeg.org/download.html"
-        )
-    
-    try:
-        # Create AudioSegment from raw PCM data
-        audio = AudioSegment(
-            pcm_data,
-            frame_rate=sample_rate,
-            channels=channels,
-            sample_width=sample_width
+
+    def __init__(self, sample_rate: int = 24000, channels: int = 1, sample_width: int = 2, vbr_quality: int = 5):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.vbr_quality = vbr_quality
+        self.pcm_bytes = 0
+        self._lame = None
+        self._mp3 = bytearray()
+        self._process = None
+        self._stdout_task = None
+        self._stderr_task = None
+
+    @staticmethod
+    def available() -> bool:
+        """Whether either MP3 encoder can be used."""
+        return lameenc is not None or check_ffmpeg_available()
+
+    async def start(self) -> None:
+        """Set up the encoder.
+        
+        Raises:
+            FileNotFoundError: If ffmpeg is needed but not installed
+        """
+        if lameenc is not None and self.sample_width == 2:
+            bit_rate = LAME_VBR_BITRATES[self.vbr_quality]
+            if self.sample_rate < 32000:
+                bit_rate = min(bit_rate, MPEG2_MAX_BITRATE)
+            self._lame = lameenc.Encoder()
+            self._lame.set_bit_rate(bit_rate)
+            self._lame.set_in_sample_rate(self.sample_rate)
+            self._lame.set_channels(self.channels)
+            # Encoder algorithm quality, 2 (best) to 7 (fastest)
+            self._lame.set_quality(5)
+            return
+        
+        if not check_ffmpeg_available():
+            raise FileNotFoundError(
+                "ffmpeg is not installed or not in PATH. "
+                "Please install ffmpeg:\n"
+                "  macOS: brew install ffmpeg\n"
+                "  Linux: sudo apt-get install ffmpeg\n"
+                "  Windows: Download from https://ffmpeg.org/download.html"
+            )
+        # One ffmpeg process reads PCM on stdin while it arrives and writes MP3 to stdout
+        self._process = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-f", PCM_FFMPEG_FORMATS[self.sample_width], "-ar", str(self.sample_rate), "-ac", str(self.channels), "-i", "pipe:0",
+            "-codec:a", "libmp3lame", "-q:a", str(self.vbr_quality), "-f", "mp3", "pipe:1",
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
         )
-        # Export to MP3
-        mp3_buffer = io.BytesIO()
-        audio.export(mp3_buffer, format="mp3", bitrate="128k")
-        return mp3_buffer.getvalue()
-    except FileNotFoundError:
-        # Re-raise FileNotFoundError with our custom message
-        raise
-    except Exception as e:
-        logger.error(f"Error converting PCM to MP3: {e}", exc_info=True)
-        raise
+        # Drain the output while feeding input so neither pipe fills up and stalls ffmpeg
+        self._stdout_task = asyncio.create_task(self._process.stdout.read())
+        self._stderr_task = asyncio.create_task(self._process.stderr.read())
+
+    async def feed(self, pcm_data: bytes) -> None:
+        """Encode the next chunk of PCM audio."""
+        self.pcm_bytes += len(pcm_data)
+        if self._lame is not None:
+            self._mp3 += self._lame.encode(pcm_data)
+        else:
+            self._process.stdin.write(pcm_data)
+            await self._process.stdin.drain()
+
+    async def finish(self) -> bytes:
+        """Flush the encoder and return the complete MP3.
+        
+        Raises:
+            RuntimeError: If ffmpeg fails to encode the audio
+        """
+        if self._lame is not None:
+            self._mp3 += self._lame.flush()
+            return bytes(self._mp3)
+        self._process.stdin.close()
+        mp3_data = await self._stdout_task
+        error = (await self._stderr_task).decode(errors="replace").strip()
+        returncode = await self._process.wait()
+        if returncode != 0:
+            logger.error(f"Error converting PCM to MP3: {error}")
+            raise RuntimeError(f"ffmpeg exited with code {returncode}: {error}")
+        return mp3_data
+
+    async def abort(self) -> None:
+        """Stop the encoder without producing output."""
+        if self._process is not None and self._process.returncode is None:
+            self._process.kill()
+            await self._process.wait()
+            await asyncio.gather(self._stdout_task, self._stderr_task, return_exceptions=True)
 
 
 def call_api(
@@ -180,36 +411,101 @@ def call_api(
     return resp.content
 
 
-async def get_realtime_response(
-    endpoint: str,
-    question_text: str,
-) -> tuple[str, bytes]:
-    """Connect to WebSocket /realtime endpoint and capture both text and audio response.
-    
-    Returns:
-        tuple: (response_text, audio_data)
+def estimate_tokens(text: str) -> int:
+    """Rough token count for rate limiting (about four characters per token)."""
+    return max(1, len(text) // 4)
+
+
+class RateLimiter:
+    """Token bucket that paces calls to a deployment's requests-per-minute and tokens-per-minute quota.
+
+    A limit of 0 leaves that dimension unthrottled, so an unconfigured limiter never waits.
     """
-    # Convert HTTP endpoint to WebSocket (app's /realtime endpoint proxies to Azure OpenAI)
-    ws_url = endpoint.replace("https://", "wss://").replace("http://", "ws://") + "/realtime"
-    
-    # App's WebSocket endpoint doesn't require auth headers (it handles auth internally)
-    # Handle SSL verification - Azure Container Apps should have valid certs, but allow disabling for dev/testing
-    ssl_context = None
-    ssl_verify = os.environ.get("SSL_VERIFY", "true").lower()
-    if ssl_verify == "false":
-        logger.warning("SSL verification disabled (SSL_VERIFY=false) - use only for development/testing")
-        ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-    elif "azurecontainerapps.io" in endpoint.lower():
-        # For Azure Container Apps, use default SSL context (should work with valid certs)
-        ssl_context = ssl.create_default_context()
-    # For other endpoints, use default (None = default SSL context)
-    
-    audio_chunks = []
-    response_text = ""
-    
-    async with websockets.connect(ws_url, ssl=ssl_context) as ws:
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        # Buckets start full so the first calls go out immediately
+        self._available_requests = requests_per_minute
+        self._available_tokens = tokens_per_minute
+        self._last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls, prefix: str) -> "RateLimiter":
+        """Build a limiter from <prefix>_RPM and <prefix>_TPM environment variables."""
+        return cls(
+            requests_per_minute=float(os.environ.get(f"{prefix}_RPM", "0")),
+            tokens_per_minute=float(os.environ.get(f"{prefix}_TPM", "0")),
+        )
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed_minutes = (now - self._last_refill) / 60
+        self._last_refill = now
+        self._available_requests = min(self.requests_per_minute, self._available_requests + elapsed_minutes * self.requests_per_minute)
+        self._available_tokens = min(self.tokens_per_minute, self._available_tokens + elapsed_minutes * self.tokens_per_minute)
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """Wait until one request and the given number of tokens fit in the quota, then take them."""
+        if not self.requests_per_minute and not self.tokens_per_minute:
+            return
+        # A single call larger than the whole bucket could never fit, so let it through once the bucket is full
+        tokens = min(tokens, self.tokens_per_minute)
+        async with self._lock:
+            while True:
+                self._refill()
+                wait_seconds = 0.0
+                if self.requests_per_minute and self._available_requests < 1:
+                    wait_seconds = (1 - self._available_requests) * 60 / self.requests_per_minute
+                if self.tokens_per_minute and self._available_tokens < tokens:
+                    wait_seconds = max(wait_seconds, (tokens - self._available_tokens) * 60 / self.tokens_per_minute)
+                if wait_seconds == 0:
+                    break
+                await asyncio.sleep(wait_seconds)
+            if self.requests_per_minute:
+                self._available_requests -= 1
+            if self.tokens_per_minute:
+                self._available_tokens -= tokens
+
+
+class RealtimeClient:
+    """WebSocket session with the app's /realtime endpoint, reused for many questions to skip repeated handshakes.
+
+    The connection is opened by the first question, so a failed connect is reported against that question.
+    Each question is asked as its own turn, and the turn's visible items are deleted once answered so later
+    answers aren't conditioned on earlier ones. Use as an async context manager.
+    """
+
+    def __init__(self, endpoint: str, rate_limiter: RateLimiter | None = None):
+        # Convert HTTP endpoint to WebSocket (app's /realtime endpoint proxies to Azure OpenAI)
+        self.ws_url = endpoint.replace("https://", "wss://").replace("http://", "ws://") + "/realtime"
+        self.rate_limiter = rate_limiter
+        self._ws = None
+        
+        # App's WebSocket endpoint doesn't require auth headers (it handles auth internally)
+        # Handle SSL verification - Azure Container Apps should have valid certs, but allow disabling for dev/testing
+        self.ssl_context = None
+        ssl_verify = os.environ.get("SSL_VERIFY", "true").lower()
+        if ssl_verify == "false":
+            logger.warning("SSL verification disabled (SSL_VERIFY=false) - use only for development/testing")
+            self.ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+            self.ssl_context.check_hostname = False
+            self.ssl_context.verify_mode = ssl.CERT_NONE
+        elif "azurecontainerapps.io" in endpoint.lower():
+            # For Azure Container Apps, use default SSL context (should work with valid certs)
+            self.ssl_context = ssl.create_default_context()
+        # For other endpoints, use default (None = default SSL context)
+
+    async def __aenter__(self) -> "RealtimeClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def connect(self) -> None:
+        """Open the WebSocket, configure the session and wait until it is created."""
+        self._ws = await websockets.connect(self.ws_url, ssl=self.ssl_context)
         logger.info("WebSocket connected, starting session...")
         # Start session - enable audio and text output
         session_update = {
@@ -222,206 +518,282 @@ async def get_realtime_response(
                 "output_audio_format": "pcm16"
             }
         }
-        await ws.send(json.dumps(session_update))
-        logger.info("Sent session.update")
+        await self._ws.send(json.dumps(session_update))
+        logger.debug("Sent session.update")
         
         # Wait for session.created
         session_created = False
         while not session_created:
-            msg = await ws.recv()
-            message = json.loads(msg)
+            msg = await self._ws.recv()
+            message = load_json(msg)
             msg_type = message.get("type")
-            logger.info(f"Waiting for session.created, received: {msg_type}")
+            logger.debug(f"Waiting for session.created, received: {msg_type}")
             if msg_type == "session.created":
                 session_created = True
                 logger.info("Session created successfully")
+
+    async def close(self) -> None:
+        """Close the WebSocket if it is open."""
+        if self._ws is not None:
+            ws, self._ws = self._ws, None
+            await ws.close()
+
+    async def delete_items(self, item_ids: list[str]) -> None:
+        """Delete conversation items and wait until each deletion is confirmed.
+        
+        Waiting here keeps a failed delete's error event from landing in the next turn. If any deletion fails or
+        isn't confirmed in time, the session is closed so the next question starts on a fresh one.
+        """
+        pending = set(item_ids)
+        for item_id in item_ids:
+            await self._ws.send(json.dumps({"type": "conversation.item.delete", "item_id": item_id}))
+        try:
+            async with asyncio.timeout(REALTIME_DELETE_TIMEOUT_SECONDS):
+                while pending:
+                    message = load_json(await self._ws.recv())
+                    msg_type = message.get("type")
+                    if msg_type == "conversation.item.deleted":
+                        pending.discard(message.get("item_id"))
+                    elif msg_type == "error":
+                        error_msg = message.get("error", {}).get("message", "Unknown error")
+                        logger.warning(f"Failed to delete conversation items, starting a fresh session: {error_msg}")
+                        await self.close()
+                        return
+        except TimeoutError:
+            logger.warning(f"Deletion of {len(pending)} conversation items not confirmed, starting a fresh session")
+            await self.close()
+        except websockets.exceptions.ConnectionClosed:
+            self._ws = None
+
+    async def ask(self, question_text: str, audio_sink: Callable[[bytes], Awaitable[None]] | None = None) -> tuple[str, bytes]:
+        """Ask one question and capture both the text and audio of the answer.
+        
+        Args:
+            question_text: The question to ask
+            audio_sink: Receives each decoded audio chunk as it arrives; audio is buffered and returned if omitted
+        
+        Returns:
+            tuple: (response_text, audio_data), where audio_data is empty when an audio_sink is given
+        """
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(estimate_tokens(question_text))
+        # Connect on first use, or again if an earlier turn lost or abandoned the connection
+        if self._ws is None:
+            await self.connect()
+
+        # Without a sink, decoded audio is appended in place rather than kept as chunks to join at the end
+        audio_buf = bytearray()
+        audio_bytes = 0
+        response_text = ""
+        # Items added to the conversation by this turn, deleted once it is answered
+        question_item_id = f"q_{uuid.uuid4().hex[:28]}"
+        turn_item_ids = [question_item_id]
         
         # Send question as text input
-        logger.info(f"Sending question: {question_text[:100]}...")
+        logger.debug(f"Sending question: {question_text[:100]}...")
         question_msg = {
             "type": "conversation.item.create",
             "item": {
+                "id": question_item_id,
                 "type": "message",
                 "role": "user",
                 "content": [{"type": "input_text", "text": question_text}]
             }
         }
-        await ws.send(json.dumps(question_msg))
-        logger.info("Sent conversation.item.create")
+        await self._ws.send(json.dumps(question_msg))
+        logger.debug("Sent conversation.item.create")
         
         # Request response
-        await ws.send(json.dumps({"type": "response.create"}))
-        logger.info("Sent response.create, waiting for response...")
+        await self._ws.send(json.dumps({"type": "response.create"}))
+        logger.debug("Sent response.create, waiting for response...")
         
         # Collect audio chunks and transcript, wait for final response.done
         # Note: There may be multiple responses (tool calls, then final answer)
         response_done = False
-        timeout_count = 0
-        max_timeout = 60  # 60 seconds timeout
-        all_messages = []  # Store all messages for debugging
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + REALTIME_RESPONSE_TIMEOUT_SECONDS
+        message_counts = Counter()  # Count of each message type, for the summary at the end
+        # Checked once per turn so per-frame debug lines cost nothing when debug logging is off
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
         response_count = 0  # Track number of responses
         
-        while not response_done:
-            try:
-                # Set a timeout for receiving messages
-                try:
-                    msg = await asyncio.wait_for(ws.recv(), timeout=1.0)
-                except asyncio.TimeoutError:
-                    timeout_count += 1
-                    if timeout_count >= max_timeout:
-                        logger.warning("WebSocket timeout waiting for response.done")
-                        break
-                    continue
-                
-                message = json.loads(msg)
-                msg_type = message.get("type")
-                all_messages.append(msg_type)
-                
-                # Log all messages for debugging
-                if msg_type in ["response.audio.delta", "response.audio_transcript.delta"]:
-                    logger.info(f"WebSocket message received: {msg_type} (THIS IS WHAT WE'RE LOOKING FOR!)")
-                else:
-                    logger.info(f"WebSocket message received: {msg_type}")
-                
-                if msg_type == "response.audio.delta":
-                    delta = message.get("delta", "")
-                    if delta:
-                        decoded = base64.b64decode(delta)
-                        audio_chunks.append(decoded)
-                        logger.info(f"Audio delta received: {len(decoded)} bytes (total: {sum(len(c) for c in audio_chunks)} bytes)")
-                
-                elif msg_type == "response.audio_transcript.delta":
-                    # Capture the transcript
-                    delta = message.get("delta", "")
-                    if delta:
-                        response_text += delta
-                        logger.info(f"Transcript delta: {delta[:100]}...")
-                
-                elif msg_type == "response.done":
-                    response_count += 1
-                    logger.info(f"Received response.done #{response_count} - checking if this is the final response...")
-                    # Check if response contains final text or audio
-                    if "response" in message:
-                        resp = message["response"]
-                        output_items = resp.get("output", [])
-                        logger.info(f"Response #{response_count} output has {len(output_items)} items")
+        # One deadline covers the whole turn, rather than polling recv() with a short timeout
+        try:
+            async with asyncio.timeout_at(deadline):
+                while not response_done:
+                    try:
+                        msg = await self._ws.recv()
+                        
+                        message = load_json(msg)
+                        msg_type = message.get("type")
+                        message_counts[msg_type] += 1
+                        if debug_enabled:
+                            logger.debug(f"WebSocket message received: {msg_type}")
                         
-                        # Check if this response has actual content (not just tool calls)
-                        has_content = False
-                        for output_item in output_items:
-                            item_type = output_item.get("type", "")
-                            if item_type not in ["function_call"]:  # Ignore function_call items
-                                has_content = True
-                                logger.info(f"Response #{response_count} has content: {item_type}")
-                                # Check for transcript in output_item
-                                if "content" in output_item:
-                                    for content_item in output_item["content"]:
-                                        if content_item.get("type") == "audio_transcript" and "transcript" in content_item:
-                                            final_transcript = content_item["transcript"]
+                        if msg_type == "response.audio.delta":
+                            delta = message.get("delta", "")
+                            if delta:
+                                decoded = b64decode(delta)
+                                audio_bytes += len(decoded)
+                                if audio_sink is not None:
+                                    await audio_sink(decoded)
+                                else:
+                                    audio_buf += decoded
+                                if debug_enabled:
+                                    logger.debug(f"Audio delta received: {len(decoded)} bytes (total: {audio_bytes} bytes)")
+                        
+                        elif msg_type == "response.audio_transcript.delta":
+                            # Capture the transcript
+                            delta = message.get("delta", "")
+                            if delta:
+                                response_text += delta
+                                if debug_enabled:
+                                    logger.debug(f"Transcript delta: {delta[:100]}...")
+                        
+                        elif msg_type == "response.done":
+                            response_count += 1
+                            logger.debug(f"Received response.done #{response_count} - checking if this is the final response...")
+                            # Check if response contains final text or audio
+                            if "response" in message:
+                                resp = message["response"]
+                                output_items = resp.get("output", [])
+                                logger.debug(f"Response #{response_count} output has {len(output_items)} items")
+                                
+                                # Check if this response has actual content (not just tool calls)
+                                has_content = False
+                                for output_item in output_items:
+                                    item_type = output_item.get("type", "")
+                                    if item_type not in ["function_call"]:  # Ignore function_call items
+                                        has_content = True
+                                        logger.debug(f"Response #{response_count} has content: {item_type}")
+                                        # Check for transcript in output_item
+                                        if "content" in output_item:
+                                            for content_item in output_item["content"]:
+                                                if content_item.get("type") == "audio_transcript" and "transcript" in content_item:
+                                                    final_transcript = content_item["transcript"]
+                                                    if final_transcript:
+                                                        response_text = final_transcript
+                                                        logger.debug(f"Found final transcript in response.done: {final_transcript[:100]}...")
+                                        elif output_item.get("type") == "audio_transcript" and "transcript" in output_item:
+                                            final_transcript = output_item["transcript"]
                                             if final_transcript:
                                                 response_text = final_transcript
-                                                logger.info(f"Found final transcript in response.done: {final_transcript[:100]}...")
-                                elif output_item.get("type") == "audio_transcript" and "transcript" in output_item:
-                                    final_transcript = output_item["transcript"]
-                                    if final_transcript:
-                                        response_text = final_transcript
-                                        logger.info(f"Found final transcript in response.done (direct): {final_transcript[:100]}...")
+                                                logger.debug(f"Found final transcript in response.done (direct): {final_transcript[:100]}...")
+                                
+                                # If this response has content (audio/transcript), it's likely the final one
+                                # Otherwise, wait for another response (tool calls completed, now generating answer)
+                                if has_content or len(output_items) == 0:
+                                    # This might be the final response, but check if we have audio/transcript
+                                    # Also check if we've received any audio/transcript deltas
+                                    if audio_bytes > 0 or len(response_text) > 0:
+                                        logger.debug(f"Response #{response_count} appears to be final (has audio/transcript)")
+                                        response_done = True
+                                    elif response_count >= 3:
+                                        # We've had multiple responses, assume this is final even if empty
+                                        logger.warning(f"Response #{response_count} is final but has no content - may indicate an error")
+                                        response_done = True
+                                    else:
+                                        logger.debug(f"Response #{response_count} completed but no content yet, waiting for next response...")
+                                        logger.debug(f"Will wait up to {deadline - loop.time():.0f} more seconds for audio/transcript")
+                                else:
+                                    logger.debug(f"Response #{response_count} only has tool calls, waiting for final response...")
+                            
+                            if response_done:
+                                # Log summary of all messages received
+                                logger.debug(f"Final response completed after {response_count} responses")
+                                logger.debug(f"Message types received: {dict(message_counts)}")
+                                logger.debug(f"Audio collected: {audio_bytes} bytes")
+                                logger.debug(f"Transcript length: {len(response_text)} chars")
+                        
+                        elif msg_type == "error":
+                            error_msg = message.get("error", {}).get("message", "Unknown error")
+                            logger.error(f"WebSocket error message: {error_msg}")
+                            break
+                        
+                        elif msg_type == "response.output_item.added":
+                            # Check if this is an audio_transcript or audio item
+                            if "item" in message:
+                                item = message["item"]
+                                item_type = item.get("type")
+                                # Serializing the whole item just to log a prefix is skipped unless debug logging is on
+                                if logger.isEnabledFor(logging.DEBUG):
+                                    logger.debug(f"response.output_item.added: type={item_type}, item={json.dumps(item)[:300]}")
+                                if item_type == "message" and "id" in item:
+                                    turn_item_ids.append(item["id"])
+                                if item_type == "audio_transcript":
+                                    if "transcript" in item:
+                                        response_text = item["transcript"]
+                                        logger.debug(f"Found transcript in output_item.added: {response_text[:100]}...")
+                                elif item_type == "audio":
+                                    # Audio item might contain audio data
+                                    logger.debug(f"Found audio item in output_item.added")
+                        
+                        elif msg_type == "response.output_item.done":
+                            # Check if this completes an audio_transcript item
+                            if "item" in message:
+                                item = message["item"]
+                                item_type = item.get("type")
+                                if logger.isEnabledFor(logging.DEBUG):
+                                    logger.debug(f"response.output_item.done: type={item_type}, item={json.dumps(item)[:300]}")
+                                if item_type == "audio_transcript" and "transcript" in item:
+                                    response_text = item["transcript"]
+                                    logger.debug(f"Found transcript in output_item.done: {response_text[:100]}...")
+                        
+                        elif msg_type == "extension.middle_tier_tool_item":
+                            # Tool call and output items are hidden by the app, which only passes their ids through
+                            turn_item_ids.append(message["item_id"])
+                        
+                        elif msg_type == "extension.middle_tier_tool_response":
+                            # Tool response from backend - log it
+                            tool_name = message.get("tool_name", "unknown")
+                            logger.debug(f"Tool response received: {tool_name}")
+                        
+                        elif msg_type == "response.created":
+                            # A new response is being created (could be after tool calls)
+                            logger.debug(f"Response created (this might be response #{response_count + 1} after tool calls)")
+                        
+                        elif msg_type in ["conversation.item.created", 
+                                          "conversation.item.deleted",
+                                          "response.function_call_arguments.delta",
+                                          "response.function_call_arguments.done",
+                                          "session.updated"]:
+                            # These are expected but we don't need to handle them (tool calls, etc.)
+                            logger.debug(f"Ignoring message type: {msg_type}")
                         
-                        # If this response has content (audio/transcript), it's likely the final one
-                        # Otherwise, wait for another response (tool calls completed, now generating answer)
-                        if has_content or len(output_items) == 0:
-                            # This might be the final response, but check if we have audio/transcript
-                            # Also check if we've received any audio/transcript deltas
-                            if len(audio_chunks) > 0 or len(response_text) > 0:
-                                logger.info(f"Response #{response_count} appears to be final (has audio/transcript)")
-                                response_done = True
-                            elif response_count >= 3:
-                                # We've had multiple responses, assume this is final even if empty
-                                logger.warning(f"Response #{response_count} is final but has no content - may indicate an error")
-                                logger.warning(f"Full response structure: {json.dumps(resp, indent=2)}")
-                                response_done = True
-                            else:
-                                logger.info(f"Response #{response_count} completed but no content yet, waiting for next response...")
-                                logger.info(f"Will wait up to {max_timeout - timeout_count} more seconds for audio/transcript")
                         else:
-                            logger.info(f"Response #{response_count} only has tool calls, waiting for final response...")
+                            logger.info(f"Unhandled message type: {msg_type}, keys: {list(message.keys())}, sample: {json.dumps(message)[:300]}")
                     
-                    if response_done:
-                        # Log summary of all messages received
-                        logger.info(f"Final response completed after {response_count} responses")
-                        logger.info(f"All message types received: {', '.join(all_messages)}")
-                        logger.info(f"Audio chunks collected: {len(audio_chunks)}, total bytes: {sum(len(c) for c in audio_chunks)}")
-                        logger.info(f"Transcript length: {len(response_text)} chars")
-                
-                elif msg_type == "error":
-                    error_msg = message.get("error", {}).get("message", "Unknown error")
-                    logger.error(f"WebSocket error message: {error_msg}")
-                    break
-                
-                elif msg_type == "response.output_item.added":
-                    # Check if this is an audio_transcript or audio item
-                    if "item" in message:
-                        item = message["item"]
-                        item_type = item.get("type")
-                        logger.info(f"response.output_item.added: type={item_type}, item={json.dumps(item)[:300]}")
-                        if item_type == "audio_transcript":
-                            if "transcript" in item:
-                                response_text = item["transcript"]
-                                logger.info(f"Found transcript in output_item.added: {response_text[:100]}...")
-                        elif item_type == "audio":
-                            # Audio item might contain audio data
-                            logger.info(f"Found audio item in output_item.added")
-                
-                elif msg_type == "response.output_item.done":
-                    # Check if this completes an audio_transcript item
-                    if "item" in message:
-                        item = message["item"]
-                        item_type = item.get("type")
-                        logger.info(f"response.output_item.done: type={item_type}, item={json.dumps(item)[:300]}")
-                        if item_type == "audio_transcript" and "transcript" in item:
-                            response_text = item["transcript"]
-                            logger.info(f"Found transcript in output_item.done: {response_text[:100]}...")
-                
-                elif msg_type == "extension.middle_tier_tool_response":
-                    # Tool response from backend - log it
-                    tool_name = message.get("tool_name", "unknown")
-                    logger.info(f"Tool response received: {tool_name}")
-                
-                elif msg_type == "response.created":
-                    # A new response is being created (could be after tool calls)
-                    logger.info(f"Response created (this might be response #{response_count + 1} after tool calls)")
-                
-                elif msg_type in ["conversation.item.created", 
-                                  "response.function_call_arguments.delta",
-                                  "response.function_call_arguments.done",
-                                  "session.updated"]:
-                    # These are expected but we don't need to handle them (tool calls, etc.)
-                    logger.debug(f"Ignoring message type: {msg_type}")
-                
-                else:
-                    logger.info(f"Unhandled message type: {msg_type}, keys: {list(message.keys())}, sample: {json.dumps(message)[:300]}")
-                    
-            except websockets.exceptions.ConnectionClosed:
-                logger.warning("WebSocket connection closed")
-                break
-            except json.JSONDecodeError as e:
-                logger.warning(f"Failed to parse WebSocket message as JSON: {e}")
-                continue
-            except Exception as e:
-                logger.warning(f"WebSocket error: {e}", exc_info=True)
-                break
-    
-    # Concatenate all audio chunks
-    audio_data = b"".join(audio_chunks) if audio_chunks else b""
-    return response_text.strip(), audio_data
+                    except websockets.exceptions.ConnectionClosed:
+                        logger.warning("WebSocket connection closed")
+                        self._ws = None
+                        break
+                    except json.JSONDecodeError as e:
+                        logger.warning(f"Failed to parse WebSocket message as JSON: {e}")
+                        continue
+                    except Exception as e:
+                        logger.warning(f"WebSocket error: {e}", exc_info=True)
+                        break
+        except TimeoutError:
+            logger.warning("WebSocket timeout waiting for response.done")
+
+        if not response_done:
+            # A timed out or failed turn may still be streaming, so start the next question on a fresh session
+            await self.close()
+        elif self._ws is not None:
+            # Remove the question, tool call, tool output and answer items so the next question starts from an empty
+            # conversation, as it would on a fresh session
+            await self.delete_items(turn_item_ids)
+        
+        audio_data = bytes(audio_buf)
+        return response_text.strip(), audio_data
 
 
 def main():
-    # Check for ffmpeg at startup and warn if not available
-    if not check_ffmpeg_available():
+    # Check for an MP3 encoder at startup and warn if neither lameenc nor ffmpeg is available
+    if not Mp3StreamEncoder.available():
         logger.warning(
             "ffmpeg is not installed or not in PATH. Answer audio will be saved as PCM instead of MP3.\n"
-            "To enable MP3 conversion, install ffmpeg:\n"
+            "To enable MP3 conversion, pip install lameenc or install ffmpeg:\n"
             "  macOS: brew install ffmpeg\n"
             "  Linux: sudo apt-get install ffmpeg\n"
             "  Windows: Download from https://ffmpeg.org/download.html"
@@ -456,7 +828,34 @@ def main():
         action="store_true",
         help="Skip generating audio files (only text Q&A)",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore cached PDF text, questions and question audio from previous runs",
+    )
+    parser.add_argument(
+        "--mp3-quality",
+        type=int,
+        choices=range(10),
+        default=5,
+        help="VBR quality for answer MP3s, 0 (best) to 9 (smallest) (default: 5)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.environ.get("VOICERAG_CONCURRENCY", "5")),
+        help="Number of questions processed at once (default: VOICERAG_CONCURRENCY or 5)",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Log each realtime turn and audio step, not just overall progress",
+    )
     args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.verbose:
+        logger.setLevel(logging.DEBUG)
 
     # Load env: azd first (has BACKEND_URI), then app/backend/.env
     project_root = Path(__file__).resolve().parent.parent
@@ -490,6 +889,8 @@ def main():
     data_dir = project_root / args.data_dir
     output_path = project_root / args.output
     output_path.parent.mkdir(parents=True, exist_ok=True)
+    # Results keyed by a hash of their inputs, kept across runs (unlike the output files cleared below)
+    cache_dir = None if args.no_cache else output_path.parent / ".cache"
 
     # Delete files from previous run
     if output_path.exists():
@@ -507,15 +908,21 @@ def main():
     # Create audio subdirs
     question_audio_dir = audio_dir / "questions"
     answer_audio_dir = audio_dir / "answers"
+    tts_cache_dir = cache_dir / "tts" if cache_dir else None
     if not args.skip_audio:
         question_audio_dir.mkdir(parents=True, exist_ok=True)
         answer_audio_dir.mkdir(parents=True, exist_ok=True)
+        if tts_cache_dir:
+            tts_cache_dir.mkdir(parents=True, exist_ok=True)
+        # Records store audio paths relative to the project root, and only the file name differs between them
+        question_audio_rel = question_audio_dir.relative_to(project_root)
+        answer_audio_rel = answer_audio_dir.relative_to(project_root)
 
     # Load documents
     if not data_dir.exists():
         logger.error(f"Data directory not found: {data_dir}")
         sys.exit(1)
-    document_content = load_document_content(data_dir)
+    document_content = load_document_content(data_dir, cache_dir)
     if not document_content.strip():
         logger.error("No document content found")
         sys.exit(1)
@@ -530,13 +937,13 @@ def main():
         token_provider = get_bearer_token_provider(
             credential, "https://cognitiveservices.azure.com/.default"
         )
-        client = AzureOpenAI(
+        client = AsyncAzureOpenAI(
             azure_ad_token_provider=token_provider,
             api_version="2024-02-15-preview",
             azure_endpoint=os.environ["AZURE_OPENAI_ENDPOINT"],
         )
     else:
-        client = AzureOpenAI(
+        client = AsyncAzureOpenAI(
             api_key=api_key,
             api_version="2024-02-15-preview",
             azure_endpoint=os.environ["AZURE_OPENAI_ENDPOINT"],
@@ -550,13 +957,13 @@ def main():
         logger.info(f"Using separate TTS endpoint: {tts_endpoint}")
         # Use TTS-specific API key if provided, otherwise use main API key or credential
         if tts_api_key:
-            tts_client = AzureOpenAI(
+            tts_client = AsyncAzureOpenAI(
                 api_key=tts_api_key,
                 api_version="2025-03-01-preview",
                 azure_endpoint=tts_endpoint,
             )
         elif api_key:
-            tts_client = AzureOpenAI(
+            tts_client = AsyncAzureOpenAI(
                 api_key=api_key,
                 api_version="2025-03-01-preview",
                 azure_endpoint=tts_endpoint,
@@ -565,93 +972,123 @@ def main():
             tts_token_provider = get_bearer_token_provider(
                 credential, "https://cognitiveservices.azure.com/.default"
             )
-            tts_client = AzureOpenAI(
+            tts_client = AsyncAzureOpenAI(
                 azure_ad_token_provider=tts_token_provider,
                 api_version="2025-03-01-preview",
                 azure_endpoint=tts_endpoint,
             )
 
     deployment = os.environ.get("AZURE_OPENAI_CHAT_DEPLOYMENT", "gpt-5-mini")
-    questions = generate_questions(
-        client, document_content, args.count, deployment
-    )
-    logger.info(f"Generated {len(questions)} questions")
 
-    records = []
-    for i, question in enumerate(questions):
-        if not question.strip():
-            continue
+    tts_deployment = os.environ.get("AZURE_OPENAI_TTS_DEPLOYMENT", "tts-hd")
+    mp3_encoding_available = Mp3StreamEncoder.available()
+    tts_voice = os.environ.get("AZURE_OPENAI_REALTIME_VOICE_CHOICE", "alloy")
+    # Use TTS client if separate endpoint configured, otherwise use main client
+    tts_client_to_use = tts_client if tts_client else client
+
+    # Pace calls to the deployments' quotas up front instead of running into 429s and retry backoff
+    tts_limiter = RateLimiter.from_env("AZURE_OPENAI_TTS")
+    realtime_limiter = RateLimiter.from_env("AZURE_OPENAI_REALTIME")
+
+    async def generate_question_audio(i: int, question: str) -> str | None:
+        """Generate and save question audio locally, returning its path relative to the project root."""
+        question_audio_path = None
         try:
-            question_audio_path = None
-            answer_audio_path = None
+            q_audio_name = f"q_{i + 1:04d}.mp3"
+            q_audio_path = question_audio_dir / q_audio_name
+            tts_cache_path = tts_cache_dir / f"{content_hash(question, tts_voice, tts_deployment)}.mp3" if tts_cache_dir else None
+            if tts_cache_path and tts_cache_path.exists():
+                await asyncio.to_thread(shutil.copyfile, tts_cache_path, q_audio_path)
+                question_audio_path = str(question_audio_rel / q_audio_name)
+                logger.debug(f"[{i + 1}] Reused cached question audio (MP3)")
+            else:
+                logger.debug(f"[{i + 1}] Generating question audio locally...")
+                await tts_limiter.acquire(estimate_tokens(question))
+                tts_response = await tts_client_to_use.audio.speech.create(
+                    model=tts_deployment,
+                    voice=tts_voice,
+                    input=question,
+                )
+                # Read the binary response content (the whole body is already read, so .content is available)
+                q_audio_data = tts_response.content if hasattr(tts_response, 'content') else b""
+                if q_audio_data:
+                    await asyncio.to_thread(q_audio_path.write_bytes, q_audio_data)
+                    question_audio_path = str(question_audio_rel / q_audio_name)
+                    logger.debug(f"[{i + 1}] Saved question audio (MP3): {len(q_audio_data)} bytes")
+                    if tts_cache_path:
+                        await asyncio.to_thread(tts_cache_path.write_bytes, q_audio_data)
+        except Exception as e:
+            logger.warning(f"[{i + 1}] Failed to generate question audio locally: {e}")
+        return question_audio_path
 
-            # Step 1: Generate and save question audio locally BEFORE calling app
-            if not args.skip_audio:
+    async def fetch_answer(i: int, question: str, realtime: RealtimeClient) -> tuple[str, str | None]:
+        """Get the answer text and audio from the app, returning the text and the saved audio path."""
+        answer_audio_path = None
+        # Get answer text and audio from app via WebSocket /realtime endpoint
+        logger.debug(f"[{i + 1}] Getting answer from app via WebSocket...")
+        encoder = None
+        try:
+            if not args.skip_audio and mp3_encoding_available:
+                # realtime-mini returns 24kHz, 16-bit, mono PCM, encoded to MP3 while it streams in
+                encoder = Mp3StreamEncoder(sample_rate=24000, channels=1, sample_width=2, vbr_quality=args.mp3_quality)
+                await encoder.start()
+            # Ask over this worker's WebSocket session and get both text and audio response
+            # Note: App's /realtime endpoint handles auth internally, no headers needed
+            try:
+                answer, a_audio_data = await realtime.ask(question, audio_sink=encoder.feed if encoder else None)
+            except BaseException:
+                if encoder:
+                    await encoder.abort()
+                raise
+            audio_bytes = encoder.pcm_bytes if encoder else len(a_audio_data)
+            logger.debug(f"[{i + 1}] Received answer from app: {len(answer)} chars, {audio_bytes} audio bytes")
+            
+            # Save answer audio if available
+            if encoder and audio_bytes > 0:
                 try:
-                    tts_deployment = os.environ.get("AZURE_OPENAI_TTS_DEPLOYMENT", "tts-hd")
-                    logger.info(f"[{i + 1}] Generating question audio locally...")
-                    # Use TTS client if separate endpoint configured, otherwise use main client
-                    tts_client_to_use = tts_client if tts_client else client
-                    tts_response = tts_client_to_use.audio.speech.create(
-                        model=tts_deployment,
-                        voice=os.environ.get("AZURE_OPENAI_REALTIME_VOICE_CHOICE", "alloy"),
-                        input=question,
-                    )
-                    # Read the binary response content (synchronous response has .content attribute)
-                    q_audio_data = tts_response.content if hasattr(tts_response, 'content') else b""
-                    if q_audio_data:
-                        q_audio_path = question_audio_dir / f"q_{i + 1:04d}.mp3"
-                        q_audio_path.write_bytes(q_audio_data)
-                        question_audio_path = str(q_audio_path.relative_to(project_root))
-                        logger.info(f"[{i + 1}] Saved question audio (MP3): {len(q_audio_data)} bytes")
+                    mp3_data = await encoder.finish()
+                    a_audio_name = f"a_{i + 1:04d}.mp3"
+                    await asyncio.to_thread((answer_audio_dir / a_audio_name).write_bytes, mp3_data)
+                    answer_audio_path = str(answer_audio_rel / a_audio_name)
+                    logger.debug(f"[{i + 1}] Saved answer audio from app (MP3): {audio_bytes} bytes PCM -> {len(mp3_data)} bytes MP3")
                 except Exception as e:
-                    logger.warning(f"[{i + 1}] Failed to generate question audio locally: {e}")
+                    # The PCM was streamed into the encoder rather than kept, so there is nothing to fall back to
+                    logger.error(f"[{i + 1}] Failed to convert PCM to MP3: {e}", exc_info=True)
+            elif not args.skip_audio and audio_bytes > 0:
+                # No MP3 encoder available - save as PCM and warn user
+                a_audio_name = f"a_{i + 1:04d}.pcm"
+                await asyncio.to_thread((answer_audio_dir / a_audio_name).write_bytes, a_audio_data)
+                answer_audio_path = str(answer_audio_rel / a_audio_name)
+                logger.warning(f"[{i + 1}] Saved answer audio as PCM (no MP3 encoder available): {audio_bytes} bytes")
+                logger.warning(f"[{i + 1}] Install lameenc or ffmpeg to enable MP3 conversion")
+            elif not args.skip_audio:
+                if encoder:
+                    await encoder.abort()
+                logger.warning(f"[{i + 1}] No audio data received from WebSocket (0 bytes)")
+                
+        except (OSError, websockets.exceptions.WebSocketException) as e:
+            # Connection failures and timeouts are expected while the app is down or restarting, so only trace them with --verbose
+            logger.error(f"[{i + 1}] Failed to get answer from app WebSocket: {e!r}", exc_info=logger.isEnabledFor(logging.DEBUG))
+            answer = ""  # Fallback to empty answer on error
+        except Exception as e:
+            logger.error(f"[{i + 1}] Failed to get answer from app WebSocket: {e}", exc_info=True)
+            answer = ""  # Fallback to empty answer on error
+        return answer, answer_audio_path
 
-            # Step 2: Get answer text and audio from app via WebSocket /realtime endpoint
-            logger.info(f"[{i + 1}] Getting answer from app via WebSocket...")
-            try:
-                # Connect to WebSocket and get both text and audio response
-                # Note: App's /realtime endpoint handles auth internally, no headers needed
-                answer, a_audio_data = asyncio.run(
-                    get_realtime_response(
-                        endpoint=endpoint,
-                        question_text=question,
-                    )
+    async def process_question(i: int, question: str, realtime: RealtimeClient) -> dict:
+        """Generate question audio, fetch the app's answer and build the JSONL record for one question."""
+        try:
+            # The question audio isn't sent to the app, so generate it while the answer is being fetched
+            if args.skip_audio:
+                question_audio_path = None
+                answer, answer_audio_path = await fetch_answer(i, question, realtime)
+            else:
+                question_audio_path, (answer, answer_audio_path) = await asyncio.gather(
+                    generate_question_audio(i, question),
+                    fetch_answer(i, question, realtime),
                 )
-                logger.info(f"[{i + 1}] Received answer from app: {len(answer)} chars, {len(a_audio_data)} audio bytes")
-                
-                # Step 3: Save answer audio if available (realtime-mini returns PCM audio, convert to MP3)
-                if not args.skip_audio and a_audio_data and len(a_audio_data) > 0:
-                    try:
-                        # Convert PCM16 to MP3 (realtime-mini uses 24kHz, 16-bit, mono PCM)
-                        mp3_data = convert_pcm_to_mp3(a_audio_data, sample_rate=24000, channels=1, sample_width=2)
-                        a_audio_path = answer_audio_dir / f"a_{i + 1:04d}.mp3"
-                        a_audio_path.write_bytes(mp3_data)
-                        answer_audio_path = str(a_audio_path.relative_to(project_root))
-                        logger.info(f"[{i + 1}] Saved answer audio from app (MP3): {len(a_audio_data)} bytes PCM -> {len(mp3_data)} bytes MP3")
-                    except FileNotFoundError as e:
-                        # ffmpeg not installed - save as PCM and warn user
-                        logger.error(f"[{i + 1}] {e}")
-                        a_audio_path = answer_audio_dir / f"a_{i + 1:04d}.pcm"
-                        a_audio_path.write_bytes(a_audio_data)
-                        answer_audio_path = str(a_audio_path.relative_to(project_root))
-                        logger.warning(f"[{i + 1}] Saved answer audio as PCM (ffmpeg not available): {len(a_audio_data)} bytes")
-                        logger.warning(f"[{i + 1}] Install ffmpeg to enable MP3 conversion: brew install ffmpeg")
-                    except Exception as e:
-                        logger.error(f"[{i + 1}] Failed to convert PCM to MP3: {e}", exc_info=True)
-                        # Fallback: save as PCM
-                        a_audio_path = answer_audio_dir / f"a_{i + 1:04d}.pcm"
-                        a_audio_path.write_bytes(a_audio_data)
-                        answer_audio_path = str(a_audio_path.relative_to(project_root))
-                        logger.warning(f"[{i + 1}] Saved answer audio as PCM (conversion failed): {len(a_audio_data)} bytes")
-                elif not args.skip_audio:
-                    logger.warning(f"[{i + 1}] No audio data received from WebSocket (0 bytes)")
-                    
-            except Exception as e:
-                logger.error(f"[{i + 1}] Failed to get answer from app WebSocket: {e}", exc_info=True)
-                answer = ""  # Fallback to empty answer on error
 
-            # Step 4: Create record with all data
+            # Create record with all data
             record = {
                 "id": i + 1,
                 "messages": [
@@ -666,12 +1103,11 @@ def main():
             if answer_audio_path:
                 record["answer_audio"] = answer_audio_path
 
-            records.append(record)
-            logger.info(f"[{i + 1}/{len(questions)}] Q&A recorded")
+            return record
 
         except Exception as e:
             logger.error(f"[{i + 1}] Failed: {e}")
-            records.append({
+            return {
                 "id": i + 1,
                 "messages": [
                     {"role": "user", "content": question},
@@ -680,14 +1116,71 @@ def main():
                 "question": question,
                 "answer": "",
                 "error": str(e),
-            })
+            }
+
+    async def process_all(questions: list[str], output_file: BinaryIO) -> int:
+        """Process questions on args.concurrency workers, each reusing one WebSocket session.
+
+        Records are written to output_file as they complete, in question order, and the number written is returned.
+        """
+        pending = asyncio.Queue()
+        for i, question in enumerate(questions):
+            if question.strip():
+                pending.put_nowait((i, question))
+        write_order = [i for i, question in enumerate(questions) if question.strip()]
+        # Records finished ahead of an earlier question wait here until it is written
+        completed = {}
+        written = 0
+
+        def write_ready_records():
+            nonlocal written
+            while written < len(write_order) and write_order[written] in completed:
+                output_file.write(dump_jsonl_line(completed.pop(write_order[written])))
+                written += 1
+                if written % JSONL_FLUSH_EVERY == 0:
+                    output_file.flush()
+                    logger.info(f"Recorded {written}/{len(write_order)} Q&A pairs")
+
+        async def worker():
+            async with RealtimeClient(endpoint, realtime_limiter) as realtime:
+                while not pending.empty():
+                    i, question = pending.get_nowait()
+                    completed[i] = await process_question(i, question, realtime)
+                    write_ready_records()
+
+        await asyncio.gather(*(worker() for _ in range(min(args.concurrency, pending.qsize()))))
+        return written
 
-    # Write JSONL
-    with open(output_path, "w", encoding="utf-8") as f:
-        for rec in records:
-            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    async def generate_and_answer(output_file: BinaryIO) -> int:
+        """Generate the questions and answer them on one event loop, which the async OpenAI clients are bound to."""
+        try:
+            questions = await generate_questions(
+                client, document_content, args.count, deployment, cache_dir
+            )
+            logger.info(f"Generated {len(questions)} questions")
+
+            # Answer latency is dominated by server think time, so overlap several WebSocket sessions
+            logger.info(f"Processing questions with concurrency {args.concurrency}")
+            return await process_all(questions, output_file)
+        finally:
+            await client.close()
+            if tts_client:
+                await tts_client.close()
+
+    # Stream records into a temporary file as they finish, so memory stays flat and a crash keeps what was done,
+    # and only replace the output once the run completes so it is never left half written
+    partial_path = output_path.with_name(output_path.name + ".tmp")
+    with open(partial_path, "wb", buffering=1024 * 1024) as output_file:
+        try:
+            record_count = asyncio.run(generate_and_answer(output_file))
+        except BaseException:
+            logger.error(f"Run did not complete, records written so far are in {partial_path}")
+            raise
+        output_file.flush()
+        os.fsync(output_file.fileno())
+    os.replace(partial_path, output_path)
 
-    logger.info(f"Wrote {len(records)} records to {output_path}")
+    logger.info(f"Wrote {record_count} records to {output_path}")
     logger.info("JSONL format: messages (HuggingFace chat format), question, answer")
 
 